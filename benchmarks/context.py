@@ -0,0 +1,126 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Context benchmarks: LLM context size after a scripted conversation.
+
+With the package installed (`pip install -e .`):
+
+    python benchmarks/context.py --transitions 20
+
+- Each transition adds a user message, the edge function call, its result and
+  the assistant's reply to the context
+- The context size is reported for each context strategy, as messages and
+  characters of JSON, after a quarter, half and all of the transitions
+"""
+
+import argparse
+import asyncio
+import json
+
+from loguru import logger
+from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext
+from pipecat.services.openai import OpenAILLMService
+
+from pipecat_flows import FlowManager
+
+PROMPT = "You are collecting patient intake details. " * 8
+
+STRATEGIES = {
+    "append": "append",
+    "reset": "reset",
+    "window (3 turns)": {"type": "window", "turns": 3},
+    "drop_node_messages": "drop_node_messages",
+}
+
+
+def chain_flow(transitions: int, strategy) -> dict:
+    """Build a chain of nodes with a long system prompt each."""
+    nodes = {}
+    for i in range(transitions + 1):
+        functions = []
+        if i < transitions:
+            functions.append(
+                {
+                    "type": "function",
+                    "function": {
+                        "name": f"n{i + 1}",
+                        "description": "Move on to the next step",
+                        "parameters": {"type": "object", "properties": {}},
+                    },
+                }
+            )
+        nodes[f"n{i}"] = {
+            "messages": [{"role": "system", "content": f"Step {i}. {PROMPT}"}],
+            "functions": functions,
+        }
+    return {"initial_node": "n0", "context_strategy": strategy, "nodes": nodes}
+
+
+class NullTask:
+    """Discards the frames a FlowManager queues."""
+
+    async def queue_frames(self, frames):
+        pass
+
+    async def queue_frame(self, frame):
+        pass
+
+
+async def converse(llm, transitions: int, strategy) -> list:
+    """Script the conversation and return the context size after each transition."""
+    context = OpenAILLMContext()
+    flow_manager = FlowManager(
+        chain_flow(transitions, strategy), NullTask(), llm, context=context, direct_context=True
+    )
+    await flow_manager.initialize([{"role": "system", "content": "You are a helpful assistant."}])
+
+    sizes = []
+    for i in range(transitions):
+        name = f"n{i + 1}"
+        context.add_message({"role": "user", "content": f"Here is answer number {i}. " * 5})
+        await flow_manager.handle_transition(name)
+        context.add_message(
+            {
+                "role": "assistant",
+                "content": "",
+                "tool_calls": [
+                    {
+                        "id": f"call_{i}",
+                        "type": "function",
+                        "function": {"name": name, "arguments": "{}"},
+                    }
+                ],
+            }
+        )
+        context.add_message(
+            {"role": "tool", "content": '"Acknowledged"', "tool_call_id": f"call_{i}"}
+        )
+        context.add_message({"role": "assistant", "content": "Thanks, next question."})
+        sizes.append((len(context.messages), len(json.dumps(context.messages))))
+    return sizes
+
+
+async def run(transitions: int):
+    llm = OpenAILLMService(api_key="benchmark", model="gpt-4o")
+    checkpoints = sorted({max(transitions // 4, 1), max(transitions // 2, 1), transitions})
+    print(f"{'':20}" + "".join(f"{'after ' + str(n):>26}" for n in checkpoints))
+    for label, strategy in STRATEGIES.items():
+        sizes = await converse(llm, transitions, strategy)
+        columns = (f"{sizes[n - 1][0]:6} msgs {sizes[n - 1][1]:6} chars" for n in checkpoints)
+        print(f"{label:20}" + "".join(f"{column:>26}" for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transitions", type=int, default=20, help="transitions to run")
+    args = parser.parse_args()
+
+    logger.remove()
+    asyncio.run(run(args.transitions))
+
+
+if __name__ == "__main__":
+    main()
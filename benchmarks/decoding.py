@@ -0,0 +1,107 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Decoding benchmarks: flow config decoding with and without msgspec.
+
+With the package installed (`pip install -e ".[msgspec]"`):
+
+    python benchmarks/decoding.py --nodes 5000 --runs 5
+
+- Parse: json.loads or msgspec.json.decode alone
+- Decode: decode_flow_config(), parsing followed by check_flow_config(), with
+  the json module or with msgspec, which it uses when installed
+- Compile: CompiledFlow.from_json() as a whole, for comparison
+"""
+
+import argparse
+import gc
+import json
+import time
+
+from loguru import logger
+
+from pipecat_flows import CompiledFlow, LLMProvider, decode_flow_config, decoding
+
+
+def synthetic_flow(nodes: int) -> dict:
+    """Build a chain of nodes, each with an edge function, a node function and actions."""
+    config = {"initial_node": "n0", "nodes": {}}
+    for i in range(nodes):
+        config["nodes"][f"n{i}"] = {
+            "messages": [{"role": "system", "content": f"Step {i}: ask the user about topic {i}."}],
+            "functions": [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": f"n{(i + 1) % nodes}",
+                        "description": "Move on to the next step",
+                        "parameters": {"type": "object", "properties": {}},
+                    },
+                },
+                {
+                    "type": "function",
+                    "function": {
+                        "name": f"record_{i}",
+                        "description": "Record the user's answer",
+                        "parameters": {
+                            "type": "object",
+                            "properties": {"answer": {"type": "string"}},
+                        },
+                    },
+                },
+            ],
+            "pre_actions": [{"type": "tts_say", "text": f"Step {i}"}],
+        }
+    return config
+
+
+def best_of(runs: int, fn) -> float:
+    """Get the fastest of several runs of fn(), in milliseconds.
+
+    Garbage collection is disabled while timing, as in timeit.
+    """
+    times = []
+    gc.disable()
+    try:
+        for _ in range(runs):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=5000, help="nodes in the synthetic flow")
+    parser.add_argument("--runs", type=int, default=5, help="repetitions of each timing")
+    args = parser.parse_args()
+
+    logger.remove()
+    data = json.dumps(synthetic_flow(args.nodes)).encode("utf-8")
+    print(f"{args.nodes} nodes, {len(data) / 1024:.0f} KB of JSON, best of {args.runs} runs")
+
+    msgspec = decoding.msgspec
+    backends = {"msgspec": msgspec, "json": None} if msgspec else {"json": None}
+    if not msgspec:
+        print("msgspec isn't installed, only timing the json module")
+    try:
+        for label, module in backends.items():
+            decoding.msgspec = module
+            parse = best_of(args.runs, lambda: (module.json.decode if module else json.loads)(data))
+            decode = best_of(args.runs, lambda: decode_flow_config(data))
+            compiled = best_of(args.runs, lambda: CompiledFlow.from_json(data, LLMProvider.OPENAI))
+            print(
+                f"{label:8} parse {parse:7.1f} ms    decode {decode:7.1f} ms"
+                f"    compile {compiled:7.1f} ms"
+            )
+    finally:
+        decoding.msgspec = msgspec
+
+
+if __name__ == "__main__":
+    main()
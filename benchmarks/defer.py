@@ -0,0 +1,158 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Deferred action benchmarks: latency from an edge function call to the next inference.
+
+With the package installed (`pip install -e .`):
+
+    python benchmarks/defer.py --transitions 10 --tts-time 0.2
+
+A stub LLM runs a chain of edge functions through a pipeline with the context
+aggregators. Each node has a tts_say pre-action, spoken by a stub TTS whose
+say() takes `--tts-time` seconds.
+
+- Default: the edge function returns after the node's actions have run
+- defer_actions: the edge function returns once the node is set, and the
+  actions run in the background
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from loguru import logger
+from pipecat.frames.frames import EndFrame
+from pipecat.pipeline.pipeline import Pipeline
+from pipecat.pipeline.runner import PipelineRunner
+from pipecat.pipeline.task import PipelineParams, PipelineTask
+from pipecat.processors.aggregators.openai_llm_context import (
+    OpenAILLMContext,
+    OpenAILLMContextFrame,
+)
+from pipecat.services.openai import OpenAILLMService
+
+from pipecat_flows import FlowManager
+
+
+def chain_flow(transitions: int) -> dict:
+    """Build a chain n0 -> n1 -> ... of nodes that each speak before their messages."""
+    nodes = {}
+    for i in range(transitions + 1):
+        functions = []
+        if i < transitions:
+            functions.append(
+                {
+                    "type": "function",
+                    "function": {
+                        "name": f"n{i + 1}",
+                        "description": "Move on to the next step",
+                        "parameters": {"type": "object", "properties": {}},
+                    },
+                }
+            )
+        nodes[f"n{i}"] = {
+            "messages": [{"role": "system", "content": f"Step {i}: ask about topic {i}."}],
+            "functions": functions,
+            "pre_actions": [{"type": "tts_say", "text": f"Moving on to step {i}"}],
+        }
+    return {"initial_node": "n0", "nodes": nodes}
+
+
+class SlowTTS:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.said = []
+
+    async def say(self, text):
+        await asyncio.sleep(self.delay)
+        self.said.append(text)
+
+
+class ChainLLM(OpenAILLMService):
+    """Answers each inference by calling the current node's edge function."""
+
+    def __init__(self, transitions: int):
+        super().__init__(api_key="benchmark", model="gpt-4o")
+        self.transitions = transitions
+        self.flow_manager = None
+        self.called_at = None
+        self.latencies = []
+        self.done = asyncio.Event()
+
+    async def process_frame(self, frame, direction):
+        if not isinstance(frame, OpenAILLMContextFrame):
+            await super().process_frame(frame, direction)
+            return
+
+        if self.called_at is not None:
+            self.latencies.append(time.perf_counter() - self.called_at)
+        step = int(self.flow_manager.flow.current_node[1:])
+        if step < self.transitions:
+            self.called_at = time.perf_counter()
+            await self.call_function(
+                context=frame.context,
+                tool_call_id=f"call_{step}",
+                function_name=f"n{step + 1}",
+                arguments="{}",
+            )
+        else:
+            self.done.set()
+
+
+async def bench(label: str, transitions: int, tts_time: float, defer_actions: bool):
+    """Run the chain and print the call-to-inference latency and the total time."""
+    llm = ChainLLM(transitions)
+    context = OpenAILLMContext()
+    aggregators = llm.create_context_aggregator(context)
+    task = PipelineTask(
+        Pipeline([aggregators.user(), llm, aggregators.assistant()]), PipelineParams()
+    )
+    runner = asyncio.create_task(PipelineRunner(handle_sigint=False).run(task))
+    await asyncio.sleep(0.05)
+
+    tts = SlowTTS(tts_time)
+    flow_manager = FlowManager(
+        chain_flow(transitions),
+        task,
+        llm,
+        tts,
+        context=context,
+        direct_context=True,
+        defer_actions=defer_actions,
+    )
+    llm.flow_manager = flow_manager
+    await flow_manager.initialize([])
+
+    start = time.perf_counter()
+    await task.queue_frames([aggregators.user().get_context_frame()])
+    await llm.done.wait()
+    elapsed = time.perf_counter() - start
+    await flow_manager.wait_for_actions()
+    await task.queue_frame(EndFrame())
+    await runner
+
+    # initialize() doesn't run the initial node's actions
+    in_order = tts.said == [f"Moving on to step {i}" for i in range(1, transitions + 1)]
+    print(
+        f"{label:16} call to inference median {statistics.median(llm.latencies) * 1000:7.1f} ms"
+        f"  total {elapsed * 1000:7.0f} ms  (spoken in order: {in_order})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transitions", type=int, default=10, help="transitions to run")
+    parser.add_argument("--tts-time", type=float, default=0.2, help="seconds each say() takes")
+    args = parser.parse_args()
+
+    logger.remove()
+    asyncio.run(bench("default", args.transitions, args.tts_time, False))
+    asyncio.run(bench("defer_actions", args.transitions, args.tts_time, True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Frame benchmarks: latency of queued and injected flow frames.
+
+With the package installed (`pip install -e .`):
+
+    python benchmarks/frames.py --transitions 200 --upstream 3 6
+
+- Queued: FlowManager queues its frames on the task, so they pass through
+  every processor ahead of the context aggregator
+- Injected: FlowManager pushes its frames from a FlowProcessor placed right
+  before the context aggregator
+
+The pipeline is made of pass-through processors. The latency is the time from
+handle_transition() until the new node's LLMSetToolsFrame reaches the position
+of the context aggregator.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from loguru import logger
+from pipecat.frames.frames import EndFrame, LLMSetToolsFrame
+from pipecat.pipeline.pipeline import Pipeline
+from pipecat.pipeline.runner import PipelineRunner
+from pipecat.pipeline.task import PipelineParams, PipelineTask
+from pipecat.processors.frame_processor import FrameProcessor
+from pipecat.services.openai import OpenAILLMService
+
+from pipecat_flows import FlowManager, FlowProcessor
+
+
+def node(name: str, successor: str) -> dict:
+    return {
+        "messages": [{"role": "system", "content": f"You are at node {name}."}],
+        "functions": [
+            {
+                "type": "function",
+                "function": {
+                    "name": successor,
+                    "description": f"Go to node {successor}",
+                    "parameters": {"type": "object", "properties": {}},
+                },
+            }
+        ],
+    }
+
+
+# Two nodes with different tools, so every transition sends an LLMSetToolsFrame
+FLOW_CONFIG = {"initial_node": "a", "nodes": {"a": node("a", "b"), "b": node("b", "a")}}
+
+
+class PassThrough(FrameProcessor):
+    async def process_frame(self, frame, direction):
+        await super().process_frame(frame, direction)
+        await self.push_frame(frame, direction)
+
+
+class ToolsProbe(PassThrough):
+    """Signals when an LLMSetToolsFrame reaches it."""
+
+    def __init__(self):
+        super().__init__()
+        self.received = asyncio.Event()
+
+    async def process_frame(self, frame, direction):
+        if isinstance(frame, LLMSetToolsFrame):
+            self.received.set()
+        await super().process_frame(frame, direction)
+
+
+async def bench(label: str, upstream: int, inject: bool, transitions: int):
+    """Time transitions until their tools reach the probe and print the median and p95."""
+    processor = FlowProcessor()
+    probe = ToolsProbe()
+    processors = [PassThrough() for _ in range(upstream)] + [processor, probe, PassThrough()]
+    task = PipelineTask(Pipeline(processors), PipelineParams())
+    runner = asyncio.create_task(PipelineRunner(handle_sigint=False).run(task))
+    await asyncio.sleep(0.1)
+
+    llm = OpenAILLMService(api_key="benchmark", model="gpt-4o")
+    flow_manager = FlowManager(FLOW_CONFIG, task, llm, processor=processor if inject else None)
+    await flow_manager.initialize([])
+    await probe.received.wait()
+
+    latencies = []
+    for _ in range(transitions):
+        successor = "b" if flow_manager.flow.current_node == "a" else "a"
+        probe.received.clear()
+        start = time.perf_counter()
+        await flow_manager.handle_transition(successor)
+        await probe.received.wait()
+        latencies.append(time.perf_counter() - start)
+
+    await task.queue_frame(EndFrame())
+    await runner
+    median = statistics.median(latencies) * 1e6
+    p95 = statistics.quantiles(latencies, n=20)[-1] * 1e6
+    print(f"{label:32} median {median:6.0f} us  p95 {p95:6.0f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transitions", type=int, default=200, help="transitions per run")
+    parser.add_argument(
+        "--upstream",
+        type=int,
+        nargs="+",
+        default=[3, 6],
+        help="processors ahead of the flow processor",
+    )
+    args = parser.parse_args()
+
+    logger.remove()
+    for count in args.upstream:
+        asyncio.run(bench(f"queued, {count} upstream", count, False, args.transitions))
+        asyncio.run(bench(f"injected, {count} upstream", count, True, args.transitions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Memory benchmarks: bytes per compiled node and memory left by dropped flows.
+
+With the package installed (`pip install -e .`):
+
+    python benchmarks/memory.py --nodes 2000 --flows 200
+
+- Bytes per node: memory retained by a CompiledFlow compiled from JSON, for
+  the editor example flows and a synthetic flow
+- Dropped flows: memory still allocated after compiling flows with distinct
+  prompts, e.g. one per tenant, and dropping them. Strings interned with
+  sys.intern() may never be freed, so this stays near zero only if prompts
+  aren't interned.
+"""
+
+import argparse
+import gc
+import glob
+import json
+import os
+import tracemalloc
+
+from loguru import logger
+
+from pipecat_flows import CompiledFlow, LLMProvider
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), "..", "editor", "examples", "*.json")
+
+
+def synthetic_flow(nodes: int, tenant: int = 0) -> dict:
+    """Build a chain of nodes sharing a system prompt and an 'end' edge."""
+    end = {
+        "type": "function",
+        "function": {
+            "name": "end",
+            "description": "End the conversation",
+            "parameters": {"type": "object", "properties": {}},
+        },
+    }
+    config = {
+        "initial_node": "n0",
+        "nodes": {
+            "end": {
+                "messages": [{"role": "system", "content": "Thank the user and say goodbye."}],
+                "functions": [],
+                "post_actions": [{"type": "end_conversation"}],
+            }
+        },
+    }
+    for i in range(nodes):
+        config["nodes"][f"n{i}"] = {
+            "messages": [
+                {"role": "system", "content": f"You are the assistant of tenant {tenant}."},
+                {"role": "system", "content": f"Step {i}: ask the user about topic {i}."},
+            ],
+            "functions": [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": f"n{(i + 1) % nodes}",
+                        "description": f"Move on to step {(i + 1) % nodes}",
+                        "parameters": {"type": "object", "properties": {}},
+                    },
+                },
+                end,
+            ],
+        }
+    return config
+
+
+def retained(build) -> int:
+    """Get the memory still allocated by the result of build()."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def bench_bytes_per_node(nodes: int):
+    """Print the memory a compiled flow retains per node."""
+    flows = {}
+    for path in sorted(glob.glob(EXAMPLES)):
+        with open(path, "rb") as f:
+            flows[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    flows[f"synthetic {nodes}"] = json.dumps(synthetic_flow(nodes)).encode("utf-8")
+
+    for name, data in flows.items():
+        count = len(json.loads(data)["nodes"])
+        size = retained(lambda: CompiledFlow.from_json(data, LLMProvider.OPENAI))
+        print(f"{name:24} {count:6} nodes {size / count:8.0f} bytes/node")
+
+
+def bench_dropped_flows(flows: int, nodes: int):
+    """Print the memory left after compiling flows with distinct prompts and dropping them."""
+    configs = [json.dumps(synthetic_flow(nodes, tenant)).encode("utf-8") for tenant in range(flows)]
+    # Warm up caches that aren't per flow, such as the adapters
+    CompiledFlow.from_json(configs[0], LLMProvider.OPENAI)
+
+    def compile_and_drop():
+        for data in configs[1:]:
+            CompiledFlow.from_json(data, LLMProvider.OPENAI)
+
+    size = retained(compile_and_drop)
+    print(f"{flows - 1} dropped flows of {nodes} nodes     {size / 1024:8.1f} KB left allocated")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=2000, help="nodes in the synthetic flow")
+    parser.add_argument("--flows", type=int, default=200, help="flows compiled and dropped")
+    args = parser.parse_args()
+
+    logger.remove()
+    bench_bytes_per_node(args.nodes)
+    bench_dropped_flows(args.flows, 100)
+
+
+if __name__ == "__main__":
+    main()
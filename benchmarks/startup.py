@@ -0,0 +1,196 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Startup benchmarks: import time, cold start and per-session memory.
+
+With the package installed (`pip install -e .`):
+
+    python benchmarks/startup.py --nodes 5000 --sessions 100
+
+- Import time: `import pipecat_flows` in a fresh interpreter
+- Cold start: loading a synthetic flow from JSON, compiling it, and loading
+  the same flow from a compiled artifact
+- Per-session memory: memory held by each FlowManager sharing the compiled
+  flow, after initialize() and after a few transitions
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from loguru import logger
+
+from pipecat_flows import CompiledFlow, FlowManager, LLMProvider
+
+TRANSITIONS = 3
+
+
+def synthetic_flow(nodes: int) -> dict:
+    """Build a chain of nodes, each with an edge function, a node function and actions."""
+    config = {"initial_node": "n0", "nodes": {}}
+    for i in range(nodes):
+        config["nodes"][f"n{i}"] = {
+            "messages": [{"role": "system", "content": f"Step {i}: ask the user about topic {i}."}],
+            "functions": [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": f"n{(i + 1) % nodes}",
+                        "description": "Move on to the next step",
+                        "parameters": {"type": "object", "properties": {}},
+                    },
+                },
+                {
+                    "type": "function",
+                    "function": {
+                        "name": f"record_{i}",
+                        "description": "Record the user's answer",
+                        "parameters": {
+                            "type": "object",
+                            "properties": {"answer": {"type": "string"}},
+                        },
+                    },
+                },
+            ],
+            "pre_actions": [{"type": "tts_say", "text": f"Step {i}"}],
+            "post_actions": [{"type": "log", "step": i}],
+        }
+    return config
+
+
+class NullTask:
+    """Discards the frames a FlowManager queues."""
+
+    async def queue_frames(self, frames):
+        pass
+
+    async def queue_frame(self, frame):
+        pass
+
+
+class NullTTS:
+    async def say(self, text):
+        pass
+
+
+def bench_import(runs: int):
+    """Time `import pipecat_flows` in fresh interpreters."""
+    code = (
+        "import time; start = time.perf_counter(); import pipecat_flows; "
+        "print(time.perf_counter() - start)"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    times = [
+        float(
+            subprocess.run(
+                [sys.executable, "-c", code], env=env, capture_output=True, check=True
+            ).stdout
+        )
+        for _ in range(runs)
+    ]
+    print(f"import pipecat_flows      median {statistics.median(times) * 1000:8.1f} ms")
+
+
+def bench_cold_start(config: dict, provider: LLMProvider, runs: int) -> CompiledFlow:
+    """Time compiling the flow from JSON against loading its artifact."""
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "flow.json")
+        artifact_path = os.path.join(tmp, "flow.pcflow")
+        with open(json_path, "w") as f:
+            json.dump(config, f)
+
+        compile_times, load_times = [], []
+        for _ in range(runs):
+            start = time.perf_counter()
+            flow = CompiledFlow.from_file(json_path, provider)
+            compile_times.append(time.perf_counter() - start)
+        flow.save(artifact_path)
+        for _ in range(runs):
+            start = time.perf_counter()
+            CompiledFlow.load(artifact_path)
+            load_times.append(time.perf_counter() - start)
+
+        json_size = os.path.getsize(json_path) / 1024
+        artifact_size = os.path.getsize(artifact_path) / 1024
+
+    print(
+        f"JSON load + compile       median {statistics.median(compile_times) * 1000:8.1f} ms"
+        f"  ({json_size:.0f} KB)"
+    )
+    print(
+        f"artifact load             median {statistics.median(load_times) * 1000:8.1f} ms"
+        f"  ({artifact_size:.0f} KB)"
+    )
+    return flow
+
+
+async def bench_sessions(flow: CompiledFlow, sessions: int):
+    """Measure the memory each FlowManager adds on top of the shared flow."""
+    from pipecat.services.openai import OpenAILLMService
+
+    llm = OpenAILLMService(api_key="benchmark", model="gpt-4o")
+
+    async def start_session() -> FlowManager:
+        flow_manager = FlowManager(flow, NullTask(), llm, NullTTS())
+        flow_manager.register_action("log", lambda action: None, offload=False)
+        await flow_manager.initialize([])
+        return flow_manager
+
+    # The first session registers the edge functions with the shared LLM service
+    await start_session()
+
+    # Time sessions apart from the memory measurement, which tracemalloc slows down
+    start = time.perf_counter()
+    for _ in range(sessions):
+        await start_session()
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    managers = [await start_session() for _ in range(sessions)]
+    gc.collect()
+    initialized = tracemalloc.get_traced_memory()[0]
+
+    for flow_manager in managers:
+        for _ in range(TRANSITIONS):
+            node = flow_manager.flow.current_node
+            await flow_manager.handle_transition(next(iter(flow.successors[node])))
+    gc.collect()
+    transitioned = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"session start             mean   {elapsed / sessions * 1000:8.2f} ms")
+    per_session = (initialized - baseline) / sessions / 1024
+    after_transitions = (transitioned - baseline) / sessions / 1024
+    print(f"memory per session        {per_session:8.1f} KB")
+    print(f"  after {TRANSITIONS} transitions     {after_transitions:8.1f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=5000, help="nodes in the synthetic flow")
+    parser.add_argument("--sessions", type=int, default=100, help="FlowManagers to start")
+    parser.add_argument("--runs", type=int, default=5, help="repetitions of each timing")
+    args = parser.parse_args()
+
+    logger.remove()
+    print(f"{args.nodes} nodes, {args.sessions} sessions, {args.runs} runs")
+    bench_import(args.runs)
+    flow = bench_cold_start(synthetic_flow(args.nodes), LLMProvider.OPENAI, args.runs)
+    asyncio.run(bench_sessions(flow, args.sessions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Webhook benchmarks: throughput against a local stand-in endpoint.
+
+With the package installed (`pip install -e .`):
+
+    python benchmarks/webhook.py --events 2000 --concurrency 50
+
+- New session per call: an aiohttp session opened for each event, as an
+  action handler without a shared client would
+- Shared pool: WebhookClient reusing keep-alive connections
+- Shared pool + batch: WebhookClient sending payloads in batches
+"""
+
+import argparse
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+from loguru import logger
+
+from pipecat_flows import WebhookClient
+
+
+class Endpoint:
+    """Counts the requests and events it receives."""
+
+    def __init__(self):
+        self.requests = 0
+        self.events = 0
+
+    async def handle(self, request):
+        body = await request.json()
+        self.requests += 1
+        self.events += len(body) if isinstance(body, list) else 1
+        return web.Response(text="ok")
+
+
+async def bench(label, endpoint, send, events, concurrency):
+    """Send events with at most `concurrency` in flight and print the throughput."""
+    endpoint.requests = endpoint.events = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send_one(i):
+        async with semaphore:
+            await send(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send_one(i) for i in range(events)))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:24} {events / elapsed:8.0f} events/s"
+        f"  ({endpoint.requests} requests for {endpoint.events} events)"
+    )
+
+
+async def run(events: int, concurrency: int, batch_size: int):
+    endpoint = Endpoint()
+    app = web.Application()
+    app.router.add_post("/events", endpoint.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    url = f"http://127.0.0.1:{port}/events"
+
+    async def new_session(i):
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json={"i": i}) as response:
+                await response.read()
+
+    client = WebhookClient()
+    batch = {"max_size": batch_size, "max_delay": 0.01}
+    try:
+        await bench("new session per call", endpoint, new_session, events, concurrency)
+        await bench(
+            "shared pool",
+            endpoint,
+            lambda i: client.send({"type": "webhook", "url": url, "payload": {"i": i}}),
+            events,
+            concurrency,
+        )
+        await bench(
+            "shared pool + batch",
+            endpoint,
+            lambda i: client.send(
+                {"type": "webhook", "url": url, "payload": {"i": i}, "batch": batch}
+            ),
+            events,
+            concurrency,
+        )
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=2000, help="events to send")
+    parser.add_argument("--concurrency", type=int, default=50, help="events in flight at once")
+    parser.add_argument("--batch-size", type=int, default=50, help="payloads per batch")
+    args = parser.parse_args()
+
+    logger.remove()
+    print(f"{args.events} events, {args.concurrency} in flight")
+    asyncio.run(run(args.events, args.concurrency, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
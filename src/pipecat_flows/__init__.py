@@ -4,8 +4,35 @@
 # SPDX-License-Identifier: BSD 2-Clause License
 #
 
-from .formats import LLMFormatParser, LLMProvider
+from .background import BackgroundActionPool, OverflowPolicy
+from .compiler import CompiledFlow, NodeConfig
+from .context import ContextStrategy, ContextStrategyType
+from .decoding import decode_flow_config
+from .formats import LLMFormatParser, LLMProvider, LLMProviderAdapter
 from .manager import FlowManager
+from .metrics import BackgroundMetrics, FlowMetrics, WebhookMetrics
+from .processor import FlowProcessor
 from .state import FlowState
+from .validation import FlowValidator
+from .webhook import WebhookClient
 
-__all__ = ["LLMProvider", "LLMFormatParser", "FlowState", "FlowManager"]
+__all__ = [
+    "BackgroundActionPool",
+    "BackgroundMetrics",
+    "CompiledFlow",
+    "ContextStrategy",
+    "ContextStrategyType",
+    "FlowManager",
+    "FlowMetrics",
+    "FlowProcessor",
+    "FlowState",
+    "FlowValidator",
+    "LLMFormatParser",
+    "LLMProvider",
+    "LLMProviderAdapter",
+    "NodeConfig",
+    "OverflowPolicy",
+    "WebhookClient",
+    "WebhookMetrics",
+    "decode_flow_config",
+]
@@ -0,0 +1,251 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class ActionHandler:
+    """Handler registered for an action type.
+
+    Attributes:
+        handler: Function called with the action configuration
+        is_async: Whether the handler is a coroutine function
+        offload: Whether the handler is synchronous and runs on a thread pool
+    """
+
+    handler: Callable
+    is_async: bool
+    offload: bool
+
+
+@dataclass(frozen=True, slots=True)
+class BoundAction:
+    """Action configuration bound to the handler of its type.
+
+    Attributes:
+        action: Action configuration passed to the handler
+        handler: Handler of the action's type
+        fallback: Bound fallback action, if the action has one
+        background: Whether the action runs on the background pool
+    """
+
+    action: dict
+    handler: ActionHandler
+    fallback: Optional["BoundAction"] = None
+    background: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class ActionPlan:
+    """Pre- or post-actions of a node, ready to run.
+
+    Attributes:
+        actions: Bound actions, in configuration order
+        dependencies: Indexes of the actions each action waits for (see
+            action_dependencies), or None if they run one after another
+    """
+
+    actions: Tuple[BoundAction, ...]
+    dependencies: Optional[Tuple[Tuple[int, ...], ...]] = None
+
+
+def bind_actions(
+    actions: Sequence[dict], handlers: Mapping[str, ActionHandler], path: str
+) -> ActionPlan:
+    """Bind a node's pre- or post-actions to their handlers.
+
+    Args:
+        actions: Action configurations
+        handlers: Registered handlers by action type
+        path: Path of the list in the flow config, used in error messages
+
+    Returns:
+        Actions with their handlers and ordering resolved
+
+    Raises:
+        ValueError: If no handler is registered for an action's type
+    """
+
+    def bind(action: dict, action_path: str) -> BoundAction:
+        handler = handlers.get(action["type"])
+        if handler is None:
+            raise ValueError(
+                f"No handler registered for action type `{action['type']}` - at `{action_path}`"
+            )
+        fallback = action.get("fallback")
+        return BoundAction(
+            action=action,
+            handler=handler,
+            fallback=bind(fallback, f"{action_path}.fallback") if fallback is not None else None,
+            background=action.get("background", False),
+        )
+
+    return ActionPlan(
+        actions=tuple(bind(action, f"{path}[{i}]") for i, action in enumerate(actions)),
+        dependencies=(
+            None if is_sequential(actions) else tuple(action_dependencies(actions, path))
+        ),
+    )
+
+
+def action_types(actions: Sequence[dict]) -> Iterator[str]:
+    """Get the types of a list of actions and of their fallback actions.
+
+    Args:
+        actions: Action configurations
+
+    Yields:
+        Type of each action and fallback action
+    """
+    for action in actions:
+        while action is not None:
+            yield action["type"]
+            action = action.get("fallback")
+
+
+def check_timeout(value: Any, path: str):
+    """Raise a ValueError if a timeout isn't a positive number of seconds.
+
+    Args:
+        value: Timeout value from the flow config
+        path: Path of the value in the flow config, used in error messages
+    """
+    if not isinstance(value, (int, float)) or isinstance(value, bool) or value <= 0:
+        raise ValueError(
+            f"Invalid flow config: Expected a positive number of seconds - at `{path}`"
+        )
+
+
+def check_actions(actions: Sequence[dict], path: str):
+    """Check the options of a node's pre- or post-actions.
+
+    Besides the ordering options (see action_dependencies), an action can set:
+    - 'timeout': Seconds the action may take
+    - 'on_timeout': "cancel" (default) to cancel an action that overruns its
+      timeout, or "background" to leave it running while the flow continues
+    - 'fallback': Action to run instead when the action fails or is cancelled
+      for overrunning its timeout. It doesn't run for an action left running
+      with "on_timeout": "background", which may still complete.
+    - 'background': true to queue the action to a BackgroundActionPool
+      instead of running it during the transition. Other actions don't wait
+      for it.
+
+    Args:
+        actions: Action configurations
+        path: Path of the list in the flow config, used in error messages
+
+    Raises:
+        ValueError: If an action option is invalid
+    """
+    for index, action in enumerate(actions):
+        _check_action_limits(action, f"{path}[{index}]")
+    action_dependencies(actions, path)
+
+
+def _check_action_limits(action: dict, path: str):
+    """Check the run options of an action and of its fallback."""
+    if "type" not in action:
+        raise ValueError(f"Invalid flow config: Object missing required field `type` - at `{path}`")
+    if action.get("timeout") is not None:
+        check_timeout(action["timeout"], f"{path}.timeout")
+    background = action.get("background", False)
+    if not isinstance(background, bool):
+        raise ValueError(
+            f"Invalid flow config: Expected `bool`, got `{type(background).__name__}` "
+            f"- at `{path}.background`"
+        )
+    if action.get("on_timeout", "cancel") not in ("cancel", "background"):
+        raise ValueError(
+            f"Invalid flow config: Expected one of `cancel`, `background` - at `{path}.on_timeout`"
+        )
+    fallback = action.get("fallback")
+    if fallback is not None:
+        if not isinstance(fallback, dict):
+            raise ValueError(
+                f"Invalid flow config: Expected `object` as fallback action - at `{path}.fallback`"
+            )
+        _check_action_limits(fallback, f"{path}.fallback")
+
+
+def is_sequential(actions: Sequence[dict]) -> bool:
+    """Check whether a list of actions runs strictly one after another.
+
+    Args:
+        actions: Action configurations
+
+    Returns:
+        True if no action sets 'concurrent' or 'depends_on'
+    """
+    return not any(action.get("concurrent") or "depends_on" in action for action in actions)
+
+
+def action_dependencies(actions: Sequence[dict], path: str = "$") -> List[Tuple[int, ...]]:
+    """Get the actions each action of a list waits for.
+
+    By default an action waits for the action before it. An action with
+    "concurrent": true starts without waiting, and an action with 'depends_on'
+    waits for the actions with the listed 'id's instead. Actions can only depend
+    on actions listed before them, so the dependencies never form a cycle.
+
+    Args:
+        actions: Action configurations of a node's pre- or post-actions
+        path: Path of the list in the flow config, used in error messages
+
+    Returns:
+        Indexes of the actions each action waits for
+
+    Raises:
+        ValueError: If an 'id', 'depends_on' or 'concurrent' value is invalid
+    """
+    ids: Dict[str, int] = {}
+    dependencies: List[Tuple[int, ...]] = []
+
+    for index, action in enumerate(actions):
+        action_path = f"{path}[{index}]"
+
+        concurrent = action.get("concurrent", False)
+        if not isinstance(concurrent, bool):
+            raise ValueError(
+                f"Invalid flow config: Expected `bool`, got `{type(concurrent).__name__}` "
+                f"- at `{action_path}.concurrent`"
+            )
+
+        depends_on = action.get("depends_on")
+        if depends_on is None:
+            dependencies.append(() if concurrent or index == 0 else (index - 1,))
+        else:
+            if isinstance(depends_on, str):
+                depends_on = [depends_on]
+            if not isinstance(depends_on, list) or not all(isinstance(d, str) for d in depends_on):
+                raise ValueError(
+                    f"Invalid flow config: Expected an action `id` or an array of them "
+                    f"- at `{action_path}.depends_on`"
+                )
+            for dependency in depends_on:
+                if dependency not in ids:
+                    raise ValueError(
+                        f"Invalid flow config: Unknown action `{dependency}`, actions can "
+                        f"only depend on actions listed before them - at `{action_path}.depends_on`"
+                    )
+            dependencies.append(tuple(sorted({ids[d] for d in depends_on})))
+
+        action_id = action.get("id")
+        if action_id is not None:
+            if not isinstance(action_id, str):
+                raise ValueError(
+                    f"Invalid flow config: Expected `str`, got `{type(action_id).__name__}` "
+                    f"- at `{action_path}.id`"
+                )
+            if action_id in ids:
+                raise ValueError(
+                    f"Invalid flow config: Duplicate action id `{action_id}` "
+                    f"- at `{action_path}.id`"
+                )
+            ids[action_id] = index
+
+    return dependencies
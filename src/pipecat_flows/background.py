@@ -0,0 +1,163 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+import asyncio
+import time
+from collections import deque
+from enum import Enum
+from typing import Awaitable, Callable, Deque, List, Optional
+
+from loguru import logger
+
+from .metrics import BackgroundMetrics
+
+BackgroundJob = Callable[[], Awaitable[None]]
+
+
+class OverflowPolicy(Enum):
+    """What a BackgroundActionPool does with an action when its queue is full.
+
+    - BLOCK: Wait for a free slot, slowing down the transition submitting it
+    - DROP: Discard the action
+    - SPILL: Keep the action in an unbounded overflow buffer, moved to the
+      queue as slots free up. Actions submitted while the buffer isn't empty
+      join it, so actions still run in submission order.
+    """
+
+    BLOCK = "block"
+    DROP = "drop"
+    SPILL = "spill"
+
+
+class BackgroundActionPool:
+    """Bounded pool of workers running background actions.
+
+    Actions with "background": true are queued to the pool instead of running
+    during the transition, so only the foreground actions add to its latency.
+    By default the FlowManagers of a process share one pool (see default()),
+    which bounds the number of background actions running at once across all
+    sessions.
+
+    Attributes:
+        workers: Number of actions run at once
+        max_queue: Number of actions that can wait for a worker
+        policy: What to do with an action when the queue is full
+        metrics: Counters of the actions submitted to the pool
+    """
+
+    _default: Optional["BackgroundActionPool"] = None
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_queue: int = 256,
+        policy: OverflowPolicy = OverflowPolicy.BLOCK,
+    ):
+        """Initialize the pool. Workers start when the first action is submitted.
+
+        Args:
+            workers: Number of actions run at once
+            max_queue: Number of actions that can wait for a worker
+            policy: What to do with an action when the queue is full
+
+        Raises:
+            ValueError: If workers or max_queue is not positive
+        """
+        if workers < 1 or max_queue < 1:
+            raise ValueError("BackgroundActionPool needs at least one worker and queue slot")
+
+        self.workers = workers
+        self.max_queue = max_queue
+        self.policy = OverflowPolicy(policy)
+        self.metrics = BackgroundMetrics()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._spill: Deque[BackgroundJob] = deque()
+        self._tasks: List[asyncio.Task] = []
+
+    @classmethod
+    def default(cls) -> "BackgroundActionPool":
+        """Get the pool shared by the FlowManagers of the process.
+
+        Returns:
+            Pool created with the default settings on first use
+        """
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    @property
+    def pending(self) -> int:
+        """Number of actions waiting for a worker, including spilled ones."""
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return queued + len(self._spill)
+
+    async def submit(self, job: BackgroundJob) -> bool:
+        """Queue a job for the workers.
+
+        Args:
+            job: Coroutine function running the action
+
+        Returns:
+            False if the job was dropped because the queue is full
+        """
+        self._start()
+        self.metrics.submitted += 1
+
+        if not self._queue.full() and not self._spill:
+            self._queue.put_nowait(job)
+        elif self._spill or self.policy == OverflowPolicy.SPILL:
+            # Jobs wait behind spilled ones, so they still run in submission order
+            self._spill.append(job)
+            self.metrics.spilled += 1
+        elif self.policy == OverflowPolicy.DROP:
+            self.metrics.dropped += 1
+            logger.warning("Background action queue is full, dropping action")
+            return False
+        else:
+            self.metrics.blocked += 1
+            start = time.perf_counter()
+            await self._queue.put(job)
+            self.metrics.blocked_time += time.perf_counter() - start
+
+        self.metrics.max_pending = max(self.metrics.max_pending, self.pending)
+        return True
+
+    async def join(self):
+        """Wait until every submitted job has run."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def _start(self):
+        """Start the workers on the running event loop, if not already running there."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        # Queues and tasks belong to one event loop, so a pool used from a new
+        # loop starts over
+        self._loop = loop
+        self._queue = asyncio.Queue(self.max_queue)
+        self._spill.clear()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self):
+        """Run queued jobs one at a time."""
+        while True:
+            job = await self._queue.get()
+            try:
+                await job()
+                self.metrics.completed += 1
+            except Exception as e:
+                self.metrics.failed += 1
+                logger.warning(f"Error running background action: {e}")
+            finally:
+                # Refill the queue from the overflow buffer before marking the job
+                # done, so join() doesn't return while spilled jobs are left. Other
+                # workers may have taken free slots meanwhile, so only fill free ones.
+                while self._spill and not self._queue.full():
+                    self._queue.put_nowait(self._spill.popleft())
+                self._queue.task_done()
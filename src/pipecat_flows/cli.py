@@ -0,0 +1,88 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+from .compiler import ARTIFACT_SUFFIX, CompiledFlow
+from .formats import LLMProvider
+
+
+def _compile(args: argparse.Namespace) -> int:
+    """Compile a flow configuration file into a binary artifact.
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        Process exit code
+    """
+    provider = LLMProvider(args.provider)
+
+    try:
+        with open(args.flow, "rb") as f:
+            flow = CompiledFlow.from_json(f.read(), provider)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        if args.output:
+            output = args.output
+        elif args.cache_dir:
+            output = os.path.join(args.cache_dir, flow.key + ARTIFACT_SUFFIX)
+            os.makedirs(args.cache_dir, exist_ok=True)
+        else:
+            output = os.path.splitext(args.flow)[0] + ARTIFACT_SUFFIX
+        flow.save(output)
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Compiled {len(flow.nodes)} nodes for {provider.value} to {output} (key {flow.key})")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the pipecat-flows command line interface.
+
+    Args:
+        argv: Command line arguments, defaults to sys.argv
+
+    Returns:
+        Process exit code
+    """
+    parser = argparse.ArgumentParser(prog="pipecat-flows")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    compile_parser = subparsers.add_parser(
+        "compile", help="validate and compile a flow config into a binary artifact"
+    )
+    compile_parser.add_argument("flow", help="path to the flow config JSON file")
+    compile_parser.add_argument(
+        "-p",
+        "--provider",
+        required=True,
+        choices=[provider.value for provider in LLMProvider],
+        help="LLM provider to compile the flow for",
+    )
+    output_group = compile_parser.add_mutually_exclusive_group()
+    output_group.add_argument(
+        "-o", "--output", help=f"artifact path (default: flow path with {ARTIFACT_SUFFIX} suffix)"
+    )
+    output_group.add_argument(
+        "--cache-dir", help="write the artifact to this directory, named by its content hash"
+    )
+    compile_parser.set_defaults(handler=_compile)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
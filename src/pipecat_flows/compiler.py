@@ -0,0 +1,646 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+import dataclasses
+import gc
+import hashlib
+import json
+import os
+import pickle
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Sequence, Set, Tuple, Union
+
+from loguru import logger
+
+from .actions import action_types, check_actions, check_timeout
+from .context import ContextStrategy, message_text
+from .decoding import check_flow_config, decode_flow_config
+from .formats import LLMFormatParser, LLMProvider
+from .validation import FlowValidator
+
+# Bump whenever the pickled layout of CompiledFlow or NodeConfig changes
+ARTIFACT_VERSION = 6
+ARTIFACT_SUFFIX = ".pcflow"
+
+_ARTIFACT_MAGIC = b"PCFLOW"
+_ARTIFACT_PICKLE_PROTOCOL = 5
+
+# Longest string interned process-wide while compiling, see _Interner
+_MAX_INTERNED_LENGTH = 64
+
+# Number of flows compiled from config dicts kept for reuse, see from_config()
+CONFIG_CACHE_SIZE = 64
+
+# Flows compiled from config dicts, by config identity and by content hash
+_configs_by_id: "OrderedDict[int, Tuple[dict, CompiledFlow]]" = OrderedDict()
+_configs_by_content: "OrderedDict[str, CompiledFlow]" = OrderedDict()
+
+
+def _cache_put(cache: OrderedDict, key: Any, value: Any):
+    """Add an entry to a cache, dropping the least recently used if it is full."""
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > CONFIG_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def flow_key(data: Union[bytes, str], provider: Union[LLMProvider, str]) -> str:
+    """Compute the content hash identifying a compiled flow artifact.
+
+    Args:
+        data: Flow configuration as JSON
+        provider: LLM provider the flow is compiled for
+
+    Returns:
+        Hex digest of the artifact version, the provider and the JSON content
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    name = LLMFormatParser.get_adapter(provider).name
+    digest = hashlib.sha256(f"{ARTIFACT_VERSION}:{name}:".encode("utf-8"))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class _Interner:
+    """Shares identical strings and dicts across the nodes of a flow.
+
+    Flows repeat a lot of data: the same system prompt in several nodes, or the
+    same function (e.g. an 'end' edge) defined in many of them. Interning keeps a
+    single copy of each, shared by reference.
+
+    Only keys and short identifiers, such as names, roles and types, are interned
+    process-wide with sys.intern(). Prompts and descriptions are shared through a
+    table that lives as long as the interner, since interned strings may never
+    be freed (e.g. on CPython 3.12), and every distinct prompt would stay in
+    memory for the life of the process.
+    """
+
+    def __init__(self):
+        self._dicts: Dict[str, dict] = {}
+        self._strings: Dict[str, str] = {}
+
+    def intern_dict(self, value: dict) -> dict:
+        """Get a shared copy of a dict with all of its strings shared.
+
+        Args:
+            value: Message, function or action dict
+
+        Returns:
+            Shared dict equal to the given one
+        """
+        key = json.dumps(value, sort_keys=True, default=repr)
+        shared = self._dicts.get(key)
+        if shared is None:
+            shared = self._dicts[key] = self._intern_value(value)
+        return shared
+
+    def intern_dicts(self, values: Optional[Sequence[dict]]) -> Optional[Tuple[dict, ...]]:
+        """Get a tuple of shared dicts, keeping None as None."""
+        if values is None:
+            return None
+        return tuple(self.intern_dict(value) for value in values)
+
+    def fingerprint(self, values: Sequence[dict]) -> str:
+        """Get a short content hash of a sequence of dicts.
+
+        Args:
+            values: Dicts to hash, e.g. a node's tools
+
+        Returns:
+            Hex digest, equal for equal sequences
+        """
+        data = json.dumps(values, sort_keys=True, default=repr).encode()
+        return sys.intern(hashlib.sha256(data).hexdigest()[:16])
+
+    def intern_string(self, value: str) -> str:
+        """Get a shared copy of a string.
+
+        Args:
+            value: String from the flow configuration
+
+        Returns:
+            Interned string if it is a short identifier, or else the copy shared
+            by the flow
+        """
+        if len(value) <= _MAX_INTERNED_LENGTH and not any(c.isspace() for c in value):
+            return sys.intern(value)
+        return self._strings.setdefault(value, value)
+
+    def _intern_value(self, value: Any) -> Any:
+        """Copy a JSON value, sharing its strings."""
+        if isinstance(value, str):
+            return self.intern_string(value)
+        if isinstance(value, dict):
+            return {self.intern_string(k): self._intern_value(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._intern_value(v) for v in value]
+        return value
+
+
+@dataclass(frozen=True, slots=True)
+class NodeConfig:
+    """Configuration for a single node in the flow.
+
+    A node represents a state in the conversation flow, containing all the
+    information needed for that particular point in the conversation.
+
+    Nodes are compact and immutable: sequences are stored as tuples, and
+    identical messages, functions and actions are shared between nodes.
+
+    Attributes:
+        messages: Message dicts in provider-specific format
+        functions: Function definitions in provider-specific format
+        pre_actions: Optional actions to execute before LLM inference
+        post_actions: Optional actions to execute after LLM inference
+        tools: Functions in the provider-ready format sent with LLMSetToolsFrame
+        tools_key: Content hash of the tools, equal for nodes with the same tools
+        function_names: Names of all functions available in this node
+        edge_functions: Names of functions that transition to another node
+        context_strategy: How the LLM context changes when entering the node
+        actions_timeout: Seconds the node's pre-actions, and then its
+            post-actions, may take in total
+    """
+
+    messages: Tuple[dict, ...]
+    functions: Tuple[dict, ...]
+    pre_actions: Optional[Tuple[dict, ...]] = None
+    post_actions: Optional[Tuple[dict, ...]] = None
+    tools: Tuple[dict, ...] = ()
+    tools_key: str = ""
+    function_names: FrozenSet[str] = frozenset()
+    edge_functions: FrozenSet[str] = frozenset()
+    context_strategy: ContextStrategy = ContextStrategy()
+    actions_timeout: Optional[float] = None
+
+
+class CompiledFlow:
+    """Read-only, compiled form of a flow configuration.
+
+    A compiled flow holds everything about a flow that does not change during a
+    conversation: the node graph, the provider-ready tools and the function lookup
+    tables. It is built once per process and shared by every session running the
+    flow, while each FlowState only keeps a reference to it and its current node.
+
+    The node graph is indexed at compile time: an edge runs from a node to every node
+    named by one of its functions.
+
+    Attributes:
+        initial_node: ID of the node the conversation starts in
+        nodes: Read-only mapping of node IDs to their configurations
+        provider: LLM provider the tools were compiled for
+        adapter: Format adapter for the provider
+        successors: Mapping of node IDs to the nodes their edge functions lead to
+        predecessors: Mapping of node IDs to the nodes with an edge leading to them
+        function_nodes: Mapping of function names to the nodes exposing them
+        function_names: Names of all functions available in any node
+        edge_functions: Names of all functions that transition to another node
+        terminal_nodes: Nodes without any outgoing edge
+        node_message_texts: Text of every node message, used by context strategies
+        needs_history: Whether any node's context strategy reads the conversation
+            history, which requires passing the LLM context to FlowManager
+        action_types: Types of all actions and fallback actions of any node
+        key: Content hash of the JSON the flow was compiled from, if known
+
+    Compiled flows can be saved to a binary artifact ahead of time (see the
+    `pipecat-flows compile` command) and loaded at startup, which skips JSON parsing,
+    compilation and validation. Artifacts use pickle, so only load artifacts you
+    built yourself.
+    """
+
+    def __init__(self, flow_config: dict, provider: Union[LLMProvider, str]):
+        """Compile a flow configuration.
+
+        Args:
+            flow_config: Dictionary containing the complete flow configuration,
+                        must include 'initial_node' and 'nodes' keys
+            provider: LLM provider to compile the tools for
+
+        Raises:
+            ValueError: If required configuration keys are missing, the provider
+                is not supported or the flow fails validation
+        """
+        check_flow_config(flow_config)
+        self._compile(flow_config, provider)
+
+    def _compile(self, flow_config: dict, provider: Union[LLMProvider, str]):
+        """Compile a flow configuration whose structure has been checked.
+
+        Args:
+            flow_config: Dictionary containing the complete flow configuration
+            provider: LLM provider to compile the tools for
+        """
+        self.adapter = LLMFormatParser.get_adapter(provider)
+        self.provider = self.adapter.provider
+        self.key: Optional[str] = None
+        # Variants of this flow for other providers share one cache
+        self._variants: Dict[str, CompiledFlow] = {self.adapter.name: self}
+        self._load_config(flow_config)
+        self._validate()
+
+    def for_provider(self, provider: Union[LLMProvider, str]) -> "CompiledFlow":
+        """Get this flow compiled for another LLM provider.
+
+        Only the functions and tools are converted; the node graph and lookup
+        tables are shared. Variants are cached, so each provider's tools are
+        converted once per process.
+
+        Args:
+            provider: LLM provider to compile the tools for
+
+        Returns:
+            Compiled flow for the provider
+
+        Raises:
+            ValueError: If provider is not supported
+        """
+        adapter = LLMFormatParser.get_adapter(provider)
+        variant = self._variants.get(adapter.name)
+        if variant is None:
+            variant = object.__new__(CompiledFlow)
+            variant.__dict__.update(self.__dict__)
+            variant.adapter = adapter
+            variant.provider = adapter.provider
+            variant.key = None
+            interner = _Interner()
+            variant.nodes = MappingProxyType(
+                {
+                    node_id: variant._convert_node(node, interner)
+                    for node_id, node in self.nodes.items()
+                }
+            )
+            self._variants[adapter.name] = variant
+        return variant
+
+    def _convert_node(self, node: NodeConfig, interner: _Interner) -> NodeConfig:
+        """Convert a node compiled for another provider to this flow's provider.
+
+        Args:
+            node: Compiled node configuration
+            interner: Interner shared by all nodes of the flow
+
+        Returns:
+            Compiled node configuration with converted functions and tools
+        """
+        functions = interner.intern_dicts(
+            LLMFormatParser.convert_functions(node.functions, self.provider)
+        )
+        tools = interner.intern_dicts(self.adapter.format_tools(functions))
+        return dataclasses.replace(
+            node, functions=functions, tools=tools, tools_key=interner.fingerprint(tools)
+        )
+
+    @classmethod
+    def from_config(cls, flow_config: dict, provider: Union[LLMProvider, str]) -> "CompiledFlow":
+        """Compile a flow configuration, reusing the flow compiled for the same config.
+
+        Sessions created from the same config share one compiled flow, so the flow
+        is compiled, validated and analyzed once. Configs are recognized by
+        identity, or else by content, so a config decoded again for each session
+        is compiled once too. The flows of the last CONFIG_CACHE_SIZE configs are
+        kept. Don't modify a config once it has been compiled, pass a new one.
+
+        Args:
+            flow_config: Dictionary containing the complete flow configuration
+            provider: LLM provider to compile the tools for
+
+        Returns:
+            Compiled flow for the provider
+
+        Raises:
+            ValueError: If the flow configuration is invalid
+        """
+        entry = _configs_by_id.get(id(flow_config))
+        if entry is not None and entry[0] is flow_config:
+            _configs_by_id.move_to_end(id(flow_config))
+            return entry[1].for_provider(provider)
+
+        try:
+            data = json.dumps(flow_config, sort_keys=True).encode("utf-8")
+            content = hashlib.sha256(data).hexdigest()
+        except (TypeError, ValueError):
+            # Configs holding values that aren't JSON are only recognized by identity
+            content = None
+
+        flow = _configs_by_content.get(content) if content is not None else None
+        if flow is None:
+            flow = cls(flow_config, provider)
+        if content is not None:
+            _cache_put(_configs_by_content, content, flow)
+        # Keeping the config alive keeps its id from being reused by another dict
+        _cache_put(_configs_by_id, id(flow_config), (flow_config, flow))
+        return flow.for_provider(provider)
+
+    @classmethod
+    def from_json(
+        cls, data: Union[bytes, str], provider: Union[LLMProvider, str]
+    ) -> "CompiledFlow":
+        """Compile a flow configuration from JSON.
+
+        Args:
+            data: Flow configuration as JSON, e.g. exported from the editor
+            provider: LLM provider to compile the tools for
+
+        Returns:
+            Compiled flow, keyed by the hash of the JSON content
+
+        Raises:
+            ValueError: If the JSON is invalid or the flow fails validation
+        """
+        flow = cls.__new__(cls)
+        flow._compile(decode_flow_config(data), provider)
+        flow.key = flow_key(data, provider)
+        return flow
+
+    @classmethod
+    def from_file(
+        cls,
+        path: Union[str, os.PathLike],
+        provider: Union[LLMProvider, str],
+        cache_dir: Optional[Union[str, os.PathLike]] = None,
+    ) -> "CompiledFlow":
+        """Compile a flow configuration file, reusing a cached artifact if possible.
+
+        When a cache directory is given, artifacts are stored in it under their
+        content hash, so a flow is only compiled again when its JSON changes.
+
+        Args:
+            path: Path to the flow configuration JSON file
+            provider: LLM provider to compile the tools for
+            cache_dir: Optional directory for compiled artifacts
+
+        Returns:
+            Compiled flow
+
+        Raises:
+            ValueError: If the JSON is invalid or the flow fails validation
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+
+        if cache_dir is None:
+            return cls.from_json(data, provider)
+
+        key = flow_key(data, provider)
+        artifact_path = os.path.join(cache_dir, key + ARTIFACT_SUFFIX)
+        if os.path.exists(artifact_path):
+            return cls.load(artifact_path, key=key)
+
+        flow = cls.from_json(data, provider)
+        os.makedirs(cache_dir, exist_ok=True)
+        flow.save(artifact_path)
+        return flow
+
+    def save(self, path: Union[str, os.PathLike]):
+        """Save the compiled flow to a binary artifact.
+
+        The artifact is written to a temporary file first and then moved into
+        place, so concurrent workers never read a partial artifact.
+
+        Args:
+            path: Path of the artifact to write
+        """
+        key = (self.key or "").encode("ascii")
+        tmp_path = f"{os.fspath(path)}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_ARTIFACT_MAGIC)
+            f.write(bytes([ARTIFACT_VERSION, len(key)]))
+            f.write(key)
+            pickle.dump(self, f, protocol=_ARTIFACT_PICKLE_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike], key: Optional[str] = None) -> "CompiledFlow":
+        """Load a compiled flow from a binary artifact.
+
+        Args:
+            path: Path of the artifact to read
+            key: Optional content hash the artifact must have been compiled from
+
+        Returns:
+            Compiled flow
+
+        Raises:
+            ValueError: If the file is not a compatible artifact or its key doesn't match
+        """
+        with open(path, "rb") as f:
+            header = f.read(len(_ARTIFACT_MAGIC) + 2)
+            if len(header) != len(_ARTIFACT_MAGIC) + 2 or not header.startswith(_ARTIFACT_MAGIC):
+                raise ValueError(f"{path} is not a compiled flow artifact")
+            version, key_length = header[len(_ARTIFACT_MAGIC) :]
+            if version != ARTIFACT_VERSION:
+                raise ValueError(
+                    f"{path} was compiled with artifact version {version}, "
+                    f"expected {ARTIFACT_VERSION}"
+                )
+            artifact_key = f.read(key_length).decode("ascii") or None
+            if key is not None and artifact_key != key:
+                raise ValueError(f"{path} was compiled from a different flow config")
+            payload = f.read()
+
+        # Unpickling allocates one object after another without creating cycles,
+        # so pausing the cyclic garbage collector avoids repeated full scans
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            flow = pickle.loads(payload)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        if not isinstance(flow, cls):
+            raise ValueError(f"{path} is not a compiled flow artifact")
+        return flow
+
+    def __getstate__(self) -> dict:
+        """Get the picklable state, unwrapping read-only mappings."""
+        state = {
+            name: dict(value) if isinstance(value, MappingProxyType) else value
+            for name, value in self.__dict__.items()
+        }
+        # Reachability is a lazily filled cache, recompute it after loading
+        state["_reachable"] = {}
+        # Adapters are bound from the registry of the loading process
+        del state["adapter"]
+        del state["_variants"]
+        return state
+
+    def __setstate__(self, state: dict):
+        """Restore the state, wrapping mappings as read-only again."""
+        for name in ("nodes", "successors", "predecessors", "function_nodes"):
+            state[name] = MappingProxyType(state[name])
+        self.__dict__.update(state)
+        self.adapter = LLMFormatParser.get_adapter(self.provider)
+        self._variants = {self.adapter.name: self}
+
+    def _load_config(self, config: dict):
+        """Load the flow configuration.
+
+        Args:
+            config: Dictionary containing the flow configuration
+        """
+        self.initial_node: str = config["initial_node"]
+        default_strategy = ContextStrategy()
+        if config.get("context_strategy") is not None:
+            default_strategy = ContextStrategy.from_config(
+                config["context_strategy"], "$.context_strategy"
+            )
+
+        # Edge functions can only be identified once every node ID is known
+        interner = _Interner()
+        node_ids = frozenset(interner.intern_string(node_id) for node_id in config["nodes"])
+        self.nodes: Mapping[str, NodeConfig] = MappingProxyType(
+            {
+                interner.intern_string(node_id): self._compile_node(
+                    node_id, node_config, node_ids, interner, default_strategy
+                )
+                for node_id, node_config in config["nodes"].items()
+            }
+        )
+
+        self.node_message_texts: FrozenSet[str] = frozenset(
+            message_text(message) for node in self.nodes.values() for message in node.messages
+        )
+        self.needs_history = any(
+            node.context_strategy.needs_history for node in self.nodes.values()
+        )
+        self.action_types: FrozenSet[str] = frozenset(
+            action_type
+            for node in self.nodes.values()
+            for actions in (node.pre_actions, node.post_actions)
+            if actions
+            for action_type in action_types(actions)
+        )
+        self._build_graph()
+
+    def _validate(self):
+        """Validate and analyze the compiled flow.
+
+        Raises:
+            ValueError: If the flow fails validation
+        """
+        validator = FlowValidator(self)
+        errors = validator.validate()
+        for warning in validator.warnings:
+            logger.warning(f"Flow analysis: {warning}")
+        if errors:
+            raise ValueError("Invalid flow config:\n" + "\n".join(f"- {e}" for e in errors))
+
+    def _build_graph(self):
+        """Build the adjacency and reverse indexes of the node graph."""
+        predecessors: Dict[str, Set[str]] = {node_id: set() for node_id in self.nodes}
+        function_nodes: Dict[str, Set[str]] = {}
+
+        for node_id, node in self.nodes.items():
+            for target in node.edge_functions:
+                predecessors[target].add(node_id)
+            for function_name in node.function_names:
+                function_nodes.setdefault(function_name, set()).add(node_id)
+
+        self.successors: Mapping[str, FrozenSet[str]] = MappingProxyType(
+            {node_id: node.edge_functions for node_id, node in self.nodes.items()}
+        )
+        self.predecessors: Mapping[str, FrozenSet[str]] = MappingProxyType(
+            {node_id: frozenset(sources) for node_id, sources in predecessors.items()}
+        )
+        self.function_nodes: Mapping[str, FrozenSet[str]] = MappingProxyType(
+            {name: frozenset(node_ids) for name, node_ids in function_nodes.items()}
+        )
+        self.function_names: FrozenSet[str] = frozenset(function_nodes)
+        self.edge_functions: FrozenSet[str] = self.function_names & frozenset(self.nodes)
+        self.terminal_nodes: FrozenSet[str] = frozenset(
+            node_id for node_id, targets in self.successors.items() if not targets
+        )
+        self._reachable: Dict[str, FrozenSet[str]] = {}
+
+    def reachable_from(self, node_id: str) -> FrozenSet[str]:
+        """Get every node that can be reached from a node by following edges.
+
+        The result is computed on first use and cached, since it is only needed
+        for analysis and not on the transition path.
+
+        Args:
+            node_id: ID of the node to start from
+
+        Returns:
+            IDs of all reachable nodes, including the starting node
+        """
+        if node_id not in self._reachable:
+            seen = {node_id}
+            stack = [node_id]
+            while stack:
+                for target in self.successors[stack.pop()]:
+                    if target not in seen:
+                        seen.add(target)
+                        stack.append(target)
+            self._reachable[node_id] = frozenset(seen)
+        return self._reachable[node_id]
+
+    def _compile_node(
+        self,
+        node_id: str,
+        node_config: dict,
+        node_ids: FrozenSet[str],
+        interner: _Interner,
+        default_strategy: ContextStrategy,
+    ) -> NodeConfig:
+        """Build a node and precompute the lookup tables used on every transition.
+
+        Function names and tools only depend on the configuration, so they are
+        computed once here instead of on each call.
+
+        Args:
+            node_id: ID of the node
+            node_config: Dictionary containing the node configuration
+            node_ids: IDs of all nodes in the flow
+            interner: Interner shared by all nodes of the flow
+            default_strategy: Context strategy of nodes that don't set their own
+
+        Raises:
+            ValueError: If the node's context strategy or action options are invalid
+
+        Returns:
+            Compiled node configuration
+        """
+        functions = interner.intern_dicts(
+            LLMFormatParser.convert_functions(node_config["functions"], self.provider)
+        )
+        function_names = frozenset(
+            self.adapter.get_function_name(f)
+            for f in self.adapter.get_function_definitions(functions)
+        )
+
+        tools = interner.intern_dicts(self.adapter.format_tools(functions))
+
+        # Check the action options, which are applied on each run
+        for field in ("pre_actions", "post_actions"):
+            if node_config.get(field):
+                check_actions(node_config[field], f"$.nodes.{node_id}.{field}")
+        actions_timeout = node_config.get("actions_timeout")
+        if actions_timeout is not None:
+            check_timeout(actions_timeout, f"$.nodes.{node_id}.actions_timeout")
+
+        return NodeConfig(
+            messages=interner.intern_dicts(node_config["messages"]),
+            functions=functions,
+            pre_actions=interner.intern_dicts(node_config.get("pre_actions")),
+            post_actions=interner.intern_dicts(node_config.get("post_actions")),
+            tools=tools,
+            tools_key=interner.fingerprint(tools),
+            function_names=function_names,
+            edge_functions=function_names & node_ids,
+            context_strategy=(
+                ContextStrategy.from_config(
+                    node_config["context_strategy"], f"$.nodes.{node_id}.context_strategy"
+                )
+                if node_config.get("context_strategy") is not None
+                else default_strategy
+            ),
+            actions_timeout=actions_timeout,
+        )
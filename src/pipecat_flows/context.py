@@ -0,0 +1,145 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Collection, List, Optional, Sequence
+
+
+class ContextStrategyType(Enum):
+    """How the LLM context changes when the flow enters a node.
+
+    - APPEND: Add the node's messages to the existing context
+    - RESET: Replace the context with the initial messages and the node's messages
+    - WINDOW: Keep the initial messages and the last `turns` conversation turns
+    - DROP_NODE_MESSAGES: Keep the conversation, but remove the messages added
+      by earlier nodes
+    """
+
+    APPEND = "append"
+    RESET = "reset"
+    WINDOW = "window"
+    DROP_NODE_MESSAGES = "drop_node_messages"
+
+
+@dataclass(frozen=True, slots=True)
+class ContextStrategy:
+    """Context strategy of a node, set with the 'context_strategy' config key.
+
+    The key can be set for the whole flow and overridden per node. It is either a
+    strategy name, e.g. "reset", or an object with a 'type' and the strategy's
+    options, e.g. {"type": "window", "turns": 4}.
+
+    Attributes:
+        type: Strategy type
+        turns: Number of conversation turns kept by the WINDOW strategy
+    """
+
+    type: ContextStrategyType = ContextStrategyType.APPEND
+    turns: Optional[int] = None
+
+    @classmethod
+    def from_config(cls, config: Any, path: str) -> "ContextStrategy":
+        """Create a context strategy from its flow config value.
+
+        Args:
+            config: Strategy name or object with a 'type' key
+            path: Path of the value in the flow config, used in error messages
+
+        Returns:
+            Context strategy
+
+        Raises:
+            ValueError: If the value is not a valid context strategy
+        """
+        options = {"type": config} if isinstance(config, str) else dict(config)
+        try:
+            strategy_type = ContextStrategyType(options.pop("type", None))
+        except ValueError:
+            names = ", ".join(f"`{t.value}`" for t in ContextStrategyType)
+            raise ValueError(
+                f"Invalid flow config: Expected one of {names} as context strategy - at `{path}`"
+            ) from None
+
+        turns = options.pop("turns", None)
+        if strategy_type == ContextStrategyType.WINDOW:
+            if not isinstance(turns, int) or isinstance(turns, bool) or turns < 1:
+                raise ValueError(
+                    f"Invalid flow config: Expected a positive `turns` count - at `{path}`"
+                )
+        elif turns is not None:
+            options["turns"] = turns
+
+        if options:
+            raise ValueError(
+                f"Invalid flow config: Unexpected option `{next(iter(options))}` for "
+                f"`{strategy_type.value}` context strategy - at `{path}`"
+            )
+        return cls(strategy_type, turns)
+
+    @property
+    def needs_history(self) -> bool:
+        """Whether the strategy reads the conversation history from the LLM context."""
+        return self.type in (ContextStrategyType.WINDOW, ContextStrategyType.DROP_NODE_MESSAGES)
+
+    def apply(
+        self,
+        history: Sequence[dict],
+        initial_messages: Sequence[dict],
+        node_message_texts: Collection[str],
+    ) -> List[dict]:
+        """Get the messages kept from the current context when entering a node.
+
+        The node's own messages are added after the returned messages. Messages
+        are in the standard (OpenAI) format the LLM contexts use for storage.
+
+        Args:
+            history: Current context messages, unused by APPEND and RESET
+            initial_messages: Messages the flow was initialized with
+            node_message_texts: Text of every node message in the flow
+
+        Returns:
+            Messages to keep
+        """
+        if self.type == ContextStrategyType.APPEND:
+            return list(history)
+        if self.type == ContextStrategyType.RESET:
+            return list(initial_messages)
+        if self.type == ContextStrategyType.DROP_NODE_MESSAGES:
+            return [m for m in history if message_text(m) not in node_message_texts]
+
+        # WINDOW: start at the oldest of the last `turns` user messages. Node
+        # messages can have the user role too, so they don't start a turn.
+        initial_texts = {message_text(m) for m in initial_messages}
+        conversation = [m for m in history if message_text(m) not in initial_texts]
+        turn_starts = [
+            i
+            for i, message in enumerate(conversation)
+            if message.get("role") == "user" and message_text(message) not in node_message_texts
+        ]
+        start = turn_starts[-self.turns] if len(turn_starts) >= self.turns else 0
+        return list(initial_messages) + conversation[start:]
+
+
+def message_text(message: dict) -> str:
+    """Get the text of a message, joining text content blocks.
+
+    Args:
+        message: Message dictionary
+
+    Returns:
+        Message text, or an empty string for messages without text
+    """
+    content = message.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(
+            item["text"]
+            for item in content
+            if isinstance(item, dict) and item.get("type") == "text" and "text" in item
+        )
+    return ""
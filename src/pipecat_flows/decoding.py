@@ -0,0 +1,156 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+import json
+from typing import Any, Union
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _type_name(value: Any) -> str:
+    """Get the JSON type name of a decoded value."""
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, str):
+        return "str"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "number"
+    return "null" if value is None else type(value).__name__
+
+
+def _expect(value: Any, expected: type, path: str):
+    """Raise a ValueError if a value doesn't have the expected type."""
+    if not isinstance(value, expected):
+        name = {dict: "object", list: "array", str: "str"}[expected]
+        raise ValueError(
+            f"Invalid flow config: Expected `{name}`, got `{_type_name(value)}` - at `{path}`"
+        )
+
+
+def _expect_objects(value: Any, path: str):
+    """Raise a ValueError if a value isn't an array of objects."""
+    _expect(value, list, path)
+    for i, item in enumerate(value):
+        _expect(item, dict, f"{path}[{i}]")
+
+
+def _expect_strategy(config: dict, path: str):
+    """Raise a ValueError if a context strategy is neither a name nor an object."""
+    strategy = config.get("context_strategy")
+    if strategy is not None and not isinstance(strategy, (str, dict)):
+        raise ValueError(
+            "Invalid flow config: Expected `str | object`, "
+            f"got `{_type_name(strategy)}` - at `{path}.context_strategy`"
+        )
+
+
+def _require(config: dict, field: str, path: str) -> Any:
+    """Get a required field, raising a ValueError if it is missing."""
+    if field not in config:
+        raise ValueError(
+            f"Invalid flow config: Object missing required field `{field}` - at `{path}`"
+        )
+    return config[field]
+
+
+def _expect_function(function: dict, path: str):
+    """Raise a ValueError if a node function entry doesn't name its function(s).
+
+    Entries are in OpenAI's format ({"type": "function", "function": {...}}),
+    Gemini's ({"function_declarations": [...]}), or Anthropic's and the neutral
+    schema, which both have a top-level 'name'.
+    """
+    if "function" in function:
+        _expect(function["function"], dict, f"{path}.function")
+        definitions = [(function["function"], f"{path}.function")]
+    elif "function_declarations" in function:
+        declarations = function["function_declarations"]
+        _expect_objects(declarations, f"{path}.function_declarations")
+        definitions = [
+            (declaration, f"{path}.function_declarations[{i}]")
+            for i, declaration in enumerate(declarations)
+        ]
+    else:
+        definitions = [(function, path)]
+
+    for definition, definition_path in definitions:
+        _expect(_require(definition, "name", definition_path), str, f"{definition_path}.name")
+
+
+def check_flow_config(config: Any):
+    """Check the structure of a flow configuration.
+
+    This checks the types of the keys the runtime reads, reporting the first
+    problem with its path in the configuration, e.g. `$.nodes.greeting.functions`.
+
+    Args:
+        config: Flow configuration to check
+
+    Raises:
+        ValueError: If the configuration doesn't have the expected structure
+    """
+    _expect(config, dict, "$")
+    _expect(_require(config, "initial_node", "$"), str, "$.initial_node")
+    _expect_strategy(config, "$")
+    nodes = _require(config, "nodes", "$")
+    _expect(nodes, dict, "$.nodes")
+
+    for node_id, node in nodes.items():
+        path = f"$.nodes.{node_id}"
+        _expect(node, dict, path)
+        _expect_objects(_require(node, "messages", path), f"{path}.messages")
+        functions = _require(node, "functions", path)
+        _expect_objects(functions, f"{path}.functions")
+        for i, function in enumerate(functions):
+            _expect_function(function, f"{path}.functions[{i}]")
+        for field in ("pre_actions", "post_actions"):
+            if node.get(field) is not None:
+                _expect_objects(node[field], f"{path}.{field}")
+        _expect_strategy(node, path)
+        timeout = node.get("actions_timeout")
+        if timeout is not None and (
+            not isinstance(timeout, (int, float)) or isinstance(timeout, bool)
+        ):
+            raise ValueError(
+                f"Invalid flow config: Expected `number`, got `{_type_name(timeout)}` "
+                f"- at `{path}.actions_timeout`"
+            )
+
+
+def decode_flow_config(data: Union[bytes, str]) -> dict:
+    """Decode and check a flow configuration from JSON.
+
+    The JSON is parsed with msgspec when it is installed
+    (`pip install "pipecat-ai-flows[msgspec]"`), which is faster than the json
+    module, then checked with check_flow_config(). Both return the same dictionary
+    and report configuration errors with their path.
+
+    Args:
+        data: Flow configuration as JSON
+
+    Returns:
+        Flow configuration dictionary
+
+    Raises:
+        ValueError: If the JSON is invalid or doesn't have the expected structure
+    """
+    if msgspec is None:
+        config = json.loads(data)
+    else:
+        try:
+            config = msgspec.json.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(f"Invalid flow config: {e}") from e
+
+    check_flow_config(config)
+    return config
@@ -5,11 +5,7 @@
 #
 
 from enum import Enum
-from typing import Any, Dict
-
-from pipecat.services.anthropic import AnthropicLLMService
-from pipecat.services.google import GoogleLLMService
-from pipecat.services.openai import OpenAILLMService
+from typing import Any, Dict, List, Tuple, Union
 
 
 class LLMProvider(Enum):
@@ -20,38 +16,353 @@ class LLMProvider(Enum):
     OPENAI = "openai"
 
 
+class LLMProviderAdapter:
+    """Accessors for one LLM provider's message and function formats.
+
+    An adapter is bound once, when a flow is compiled or a FlowState is created, so
+    the hot path calls its methods directly instead of branching on the provider.
+    The base class implements the OpenAI-style defaults.
+
+    To support another provider, subclass this class, set `provider` and
+    `llm_classes`, and register an instance with LLMFormatParser.register_adapter().
+
+    Attributes:
+        provider: LLMProvider value, or a string for third-party providers
+        llm_classes: (module, class name) pairs of the LLM services using this format.
+            Matching is done on the LLM's class hierarchy by name, so provider
+            SDKs are never imported just to detect the provider.
+    """
+
+    provider: Union[LLMProvider, str] = LLMProvider.OPENAI
+    llm_classes: Tuple[Tuple[str, str], ...] = ()
+
+    @property
+    def name(self) -> str:
+        """Provider name as a string."""
+        if isinstance(self.provider, LLMProvider):
+            return self.provider.value
+        return self.provider
+
+    def matches(self, cls: type) -> bool:
+        """Check whether a class is one of this provider's LLM services.
+
+        Args:
+            cls: Class from the LLM service's class hierarchy
+
+        Returns:
+            True if the class is listed in llm_classes
+        """
+        for module, name in self.llm_classes:
+            if cls.__name__ == name and (
+                cls.__module__ == module or cls.__module__.startswith(module + ".")
+            ):
+                return True
+        return False
+
+    def get_function_name(self, function_def: Dict[str, Any]) -> str:
+        """Extract function name from a function definition or call."""
+        return function_def["function"]["name"]
+
+    def get_function_args(self, function_call: Dict[str, Any]) -> dict:
+        """Extract function arguments from a function call."""
+        return function_call.get("arguments", {})
+
+    def get_message_content(self, message: Dict[str, Any]) -> str:
+        """Extract message content as a string."""
+        return message["content"]
+
+    def get_function_definitions(self, functions: List[dict]) -> List[dict]:
+        """Get the individual function definitions from a node's functions.
+
+        Args:
+            functions: Functions as written in the node configuration
+
+        Returns:
+            List with one entry per function
+        """
+        return functions
+
+    def format_tools(self, functions: List[dict]) -> List[dict]:
+        """Combine a node's functions into the tools sent with LLMSetToolsFrame.
+
+        Args:
+            functions: Functions as written in the node configuration
+
+        Returns:
+            Tools in the provider-ready format
+        """
+        return functions
+
+    def is_native(self, function: Dict[str, Any]) -> bool:
+        """Check whether a node function entry is written in this provider's format.
+
+        Args:
+            function: One entry of a node's functions list
+
+        Returns:
+            True if the entry can be used without conversion
+        """
+        return function.get("type") == "function" and "function" in function
+
+    def to_neutral(self, functions: List[dict]) -> List[dict]:
+        """Convert node functions in this provider's format to the neutral schema.
+
+        The neutral schema has one entry per function with 'name' and optional
+        'description' and 'parameters' (a JSON schema) keys.
+
+        Args:
+            functions: Node functions in this provider's format
+
+        Returns:
+            Function definitions in the neutral schema
+        """
+        return [func["function"] for func in functions]
+
+    def from_neutral(self, declarations: List[dict]) -> List[dict]:
+        """Convert function definitions in the neutral schema to node functions.
+
+        Args:
+            declarations: Function definitions in the neutral schema
+
+        Returns:
+            Node functions in this provider's format
+        """
+        return [{"type": "function", "function": _with_parameters(d)} for d in declarations]
+
+
+class OpenAIAdapter(LLMProviderAdapter):
+    """Adapter for OpenAI's message and function formats."""
+
+    provider = LLMProvider.OPENAI
+    llm_classes = (("pipecat.services.openai", "OpenAILLMService"),)
+
+
+class AnthropicAdapter(LLMProviderAdapter):
+    """Adapter for Anthropic's message and function formats."""
+
+    provider = LLMProvider.ANTHROPIC
+    llm_classes = (("pipecat.services.anthropic", "AnthropicLLMService"),)
+
+    def get_function_name(self, function_def: Dict[str, Any]) -> str:
+        """Extract function name from a function definition or call."""
+        return function_def["name"]
+
+    def get_message_content(self, message: Dict[str, Any]) -> str:
+        """Extract message content as a string, joining text content blocks."""
+        if isinstance(message["content"], list):
+            return " ".join(item["text"] for item in message["content"] if item["type"] == "text")
+        return message["content"]
+
+    def is_native(self, function: Dict[str, Any]) -> bool:
+        """Check whether a node function entry is written in Anthropic's format."""
+        return "input_schema" in function
+
+    def to_neutral(self, functions: List[dict]) -> List[dict]:
+        """Convert Anthropic tools to the neutral schema."""
+        declarations = []
+        for func in functions:
+            declaration = {k: v for k, v in func.items() if k != "input_schema"}
+            declaration["parameters"] = func["input_schema"]
+            declarations.append(declaration)
+        return declarations
+
+    def from_neutral(self, declarations: List[dict]) -> List[dict]:
+        """Convert neutral function definitions to Anthropic tools."""
+        tools = []
+        for declaration in declarations:
+            tool = {k: v for k, v in declaration.items() if k != "parameters"}
+            tool["input_schema"] = _with_parameters(declaration)["parameters"]
+            tools.append(tool)
+        return tools
+
+
+class GeminiAdapter(LLMProviderAdapter):
+    """Adapter for Google Gemini's message and function formats."""
+
+    provider = LLMProvider.GEMINI
+    llm_classes = (("pipecat.services.google", "GoogleLLMService"),)
+
+    def get_function_name(self, function_def: Dict[str, Any]) -> str:
+        """Extract function name from a function declaration or call."""
+        return function_def["name"]
+
+    def get_function_args(self, function_call: Dict[str, Any]) -> dict:
+        """Extract function arguments from a function call."""
+        return function_call.get("args", {})
+
+    def get_function_definitions(self, functions: List[dict]) -> List[dict]:
+        """Flatten Gemini's nested function declarations."""
+        declarations = []
+        for func in functions:
+            if "function_declarations" in func:
+                declarations.extend(func["function_declarations"])
+        return declarations
+
+    def format_tools(self, functions: List[dict]) -> List[dict]:
+        """Combine all function declarations into a single tools object."""
+        declarations = self.get_function_definitions(functions)
+        return [{"function_declarations": declarations}] if declarations else []
+
+    def is_native(self, function: Dict[str, Any]) -> bool:
+        """Check whether a node function entry is a Gemini tools object."""
+        return "function_declarations" in function
+
+    def to_neutral(self, functions: List[dict]) -> List[dict]:
+        """Convert Gemini tools objects to the neutral schema."""
+        return self.get_function_definitions(functions)
+
+    def from_neutral(self, declarations: List[dict]) -> List[dict]:
+        """Convert neutral function definitions to a Gemini tools object."""
+        # Gemini rejects object parameters without properties, so omit them
+        converted = [
+            declaration
+            if declaration.get("parameters", {}).get("properties")
+            else {k: v for k, v in declaration.items() if k != "parameters"}
+            for declaration in declarations
+        ]
+        return [{"function_declarations": converted}] if converted else []
+
+
+def _with_parameters(declaration: Dict[str, Any]) -> Dict[str, Any]:
+    """Get a neutral function definition, adding empty parameters if missing."""
+    if declaration.get("parameters"):
+        return declaration
+    return {**declaration, "parameters": {"type": "object", "properties": {}}}
+
+
+# Registered adapters by provider name
+_adapters: Dict[str, LLMProviderAdapter] = {}
+
+# Adapters resolved so far, by LLM class
+_adapter_cache: Dict[type, LLMProviderAdapter] = {}
+
+
 class LLMFormatParser:
-    """Handles parsing of LLM-specific formats without format conversion.
+    """Handles parsing of LLM-specific formats.
 
     This class provides static methods to extract information from different
     LLM provider formats without converting between them. This approach
     maintains the original format while providing a consistent way to
     access the needed information.
+
+    The only conversion is convert_functions(), which runs when a flow is compiled
+    so that functions written in the neutral schema or another provider's format
+    can be used with any provider.
+
+    Each provider's format is handled by a registered LLMProviderAdapter. The
+    provider-based methods below look up the adapter on every call and are kept
+    for convenience; code on the hot path should bind the adapter once with
+    get_adapter() and call it directly.
     """
 
     @staticmethod
-    def get_provider(llm) -> LLMProvider:
-        """Determine provider from LLM instance.
+    def register_adapter(adapter: LLMProviderAdapter):
+        """Register an adapter, replacing any adapter for the same provider.
+
+        Args:
+            adapter: Adapter instance to register
+        """
+        _adapters[adapter.name] = adapter
+        _adapter_cache.clear()
+
+    @staticmethod
+    def get_adapter(provider: Union[LLMProvider, str]) -> LLMProviderAdapter:
+        """Get the adapter registered for a provider.
+
+        Args:
+            provider: LLM provider type or name
+
+        Returns:
+            Registered adapter
+
+        Raises:
+            ValueError: If provider is not supported
+        """
+        name = provider.value if isinstance(provider, LLMProvider) else provider
+        adapter = _adapters.get(name)
+        if adapter is None:
+            raise ValueError(f"Unsupported provider: {provider}")
+        return adapter
+
+    @staticmethod
+    def get_llm_adapter(llm) -> LLMProviderAdapter:
+        """Get the adapter for an LLM instance, cached per LLM class.
 
         Args:
             llm: LLM service instance
 
         Returns:
-            LLMProvider enum value
+            Registered adapter
 
         Raises:
             ValueError: If LLM type is not supported
         """
-        if isinstance(llm, OpenAILLMService):
-            return LLMProvider.OPENAI
-        elif isinstance(llm, AnthropicLLMService):
-            return LLMProvider.ANTHROPIC
-        elif isinstance(llm, GoogleLLMService):
-            return LLMProvider.GEMINI
+        llm_class = type(llm)
+        adapter = _adapter_cache.get(llm_class)
+        if adapter is not None:
+            return adapter
+
+        # The most specific class wins, so adapters for subclasses of a built-in
+        # service take precedence over the built-in adapter
+        for cls in llm_class.__mro__:
+            for adapter in _adapters.values():
+                if adapter.matches(cls):
+                    _adapter_cache[llm_class] = adapter
+                    return adapter
+
         raise ValueError(f"Unsupported LLM type: {type(llm)}")
 
     @staticmethod
-    def get_function_name(provider: LLMProvider, function_def: Dict[str, Any]) -> str:
+    def get_provider(llm) -> Union[LLMProvider, str]:
+        """Determine provider from LLM instance.
+
+        Args:
+            llm: LLM service instance
+
+        Returns:
+            LLMProvider enum value, or the name of a third-party provider
+
+        Raises:
+            ValueError: If LLM type is not supported
+        """
+        return LLMFormatParser.get_llm_adapter(llm).provider
+
+    @staticmethod
+    def convert_functions(functions: List[dict], provider: Union[LLMProvider, str]) -> List[dict]:
+        """Convert node functions to a provider's format.
+
+        Entries already in the provider's format are kept as they are. Entries
+        in another registered provider's format are converted, and any other
+        entry is read as a function definition in the neutral schema:
+
+            {"name": "...", "description": "...", "parameters": {...}}
+
+        Args:
+            functions: Node functions as written in the flow configuration
+            provider: LLM provider to convert the functions for
+
+        Returns:
+            Node functions in the provider's format
+
+        Raises:
+            ValueError: If provider is not supported
+        """
+        target = LLMFormatParser.get_adapter(provider)
+        if all(target.is_native(func) for func in functions):
+            return functions
+
+        converted = []
+        for func in functions:
+            if target.is_native(func):
+                converted.append(func)
+                continue
+            source = next((a for a in _adapters.values() if a.is_native(func)), None)
+            declarations = source.to_neutral([func]) if source else [func]
+            converted.extend(target.from_neutral(declarations))
+        return converted
+
+    @staticmethod
+    def get_function_name(provider: Union[LLMProvider, str], function_def: Dict[str, Any]) -> str:
         """Extract function name from provider-specific function definition.
 
         Args:
@@ -64,16 +375,10 @@ class LLMFormatParser:
         Raises:
             ValueError: If provider is not supported
         """
-        if provider == LLMProvider.OPENAI:
-            return function_def["function"]["name"]
-        elif provider == LLMProvider.ANTHROPIC:
-            return function_def["name"]
-        elif provider == LLMProvider.GEMINI:
-            return function_def["name"]
-        raise ValueError(f"Unsupported provider: {provider}")
+        return LLMFormatParser.get_adapter(provider).get_function_name(function_def)
 
     @staticmethod
-    def get_function_args(provider: LLMProvider, function_call: Dict[str, Any]) -> dict:
+    def get_function_args(provider: Union[LLMProvider, str], function_call: Dict[str, Any]) -> dict:
         """Extract function arguments from provider-specific function call.
 
         Args:
@@ -86,16 +391,10 @@ class LLMFormatParser:
         Raises:
             ValueError: If provider is not supported
         """
-        if provider == LLMProvider.OPENAI:
-            return function_call.get("arguments", {})
-        elif provider == LLMProvider.ANTHROPIC:
-            return function_call.get("arguments", {})
-        elif provider == LLMProvider.GEMINI:
-            return function_call.get("args", {})
-        raise ValueError(f"Unsupported provider: {provider}")
+        return LLMFormatParser.get_adapter(provider).get_function_args(function_call)
 
     @staticmethod
-    def get_message_content(provider: LLMProvider, message: Dict[str, Any]) -> str:
+    def get_message_content(provider: Union[LLMProvider, str], message: Dict[str, Any]) -> str:
         """Extract message content from provider-specific format.
 
         Args:
@@ -108,14 +407,9 @@ class LLMFormatParser:
         Raises:
             ValueError: If provider is not supported
         """
-        if provider == LLMProvider.OPENAI:
-            return message["content"]
-        elif provider == LLMProvider.ANTHROPIC:
-            if isinstance(message["content"], list):
-                return " ".join(
-                    item["text"] for item in message["content"] if item["type"] == "text"
-                )
-            return message["content"]
-        elif provider == LLMProvider.GEMINI:
-            return message["content"]
-        raise ValueError(f"Unsupported provider: {provider}")
+        return LLMFormatParser.get_adapter(provider).get_message_content(message)
+
+
+LLMFormatParser.register_adapter(OpenAIAdapter())
+LLMFormatParser.register_adapter(AnthropicAdapter())
+LLMFormatParser.register_adapter(GeminiAdapter())
@@ -4,19 +4,55 @@
 # SPDX-License-Identifier: BSD 2-Clause License
 #
 
+import asyncio
+import os
+import time
 from asyncio import iscoroutinefunction
-from typing import Callable, Dict, List, Optional
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple, Union
 
 from loguru import logger
 from pipecat.frames.frames import (
     EndFrame,
+    Frame,
     LLMMessagesAppendFrame,
     LLMMessagesUpdateFrame,
     LLMSetToolsFrame,
     TTSSpeakFrame,
 )
 
+from .actions import ActionHandler, ActionPlan, BoundAction, bind_actions
+from .background import BackgroundActionPool
+from .compiler import CompiledFlow
+from .context import ContextStrategyType, message_text
+from .metrics import FlowMetrics
+from .processor import FlowProcessor
 from .state import FlowState
+from .webhook import WebhookClient
+
+if TYPE_CHECKING:
+    # Importing the OpenAI context loads the OpenAI SDK, which most flows don't need
+    from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext
+
+# Token of the transition the current task runs in, so transitions started by
+# its actions don't wait for the transition lock. Tasks created by an action
+# inherit it, but it stops matching once the transition is complete.
+_current_transition: ContextVar[Optional[object]] = ContextVar("_current_transition", default=None)
+
+# Number of threads running synchronous action handlers, shared by all sessions
+ACTION_THREADS = 8
+_action_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _default_action_executor() -> ThreadPoolExecutor:
+    """Get the thread pool shared by the FlowManagers of the process."""
+    global _action_executor
+    if _action_executor is None:
+        _action_executor = ThreadPoolExecutor(
+            max_workers=ACTION_THREADS, thread_name_prefix="pipecat-flows-action"
+        )
+    return _action_executor
 
 
 class FlowManager:
@@ -40,27 +76,146 @@ class FlowManager:
 
     While all functions are registered with the LLM, only functions defined in the
     current node's configuration are available for use at any given time.
+
+    How the LLM context grows across transitions is set by the 'context_strategy'
+    key of the flow or of a node (see ContextStrategy). By default each node's
+    messages are appended to the context.
+
+    Counters about the conversation, such as the number of transitions and of
+    skipped tools updates, are kept in `metrics` (see FlowMetrics).
+
+    By default, an edge function returns its result once the whole transition is
+    complete, including slow actions such as a `tts_say` pre-action. With
+    `defer_actions`, it returns as soon as the state is updated, and the actions
+    run while the LLM responds. In that mode:
+    - The current node, context messages and tools are updated before the
+      function result is returned, as without it
+    - A node's pre-actions still run before its post-actions, and the actions of
+      consecutive transitions run in transition order
+    - Pre-actions no longer run before the context update, and frames queued by
+      actions are sent separately from the transition's frames
+
+    Edge transitions of a session run one at a time, in the order the calls
+    arrive. When an LLM makes several edge calls in one turn and they are
+    dispatched concurrently, the first one transitions and the others, made for a
+    node the flow has left, are dropped. Node functions run concurrently. When an
+    action moves the flow on to another node, e.g. with an automatic transition
+    in a post-action, only the final node's context and tools are sent.
     """
 
-    def __init__(self, flow_config: dict, task, llm, tts=None):
+    def __init__(
+        self,
+        flow_config: Union[dict, CompiledFlow, str, os.PathLike],
+        task,
+        llm,
+        tts=None,
+        context: Optional["OpenAILLMContext"] = None,
+        processor: Optional[FlowProcessor] = None,
+        direct_context: bool = False,
+        fold_into_result: bool = False,
+        defer_actions: bool = False,
+        action_executor: Optional[Executor] = None,
+        background_pool: Optional[BackgroundActionPool] = None,
+        webhook_client: Optional[WebhookClient] = None,
+    ):
         """Initialize the flow manager.
 
         Args:
-            flow_config: Dictionary containing the flow configuration
+            flow_config: Dictionary containing the flow configuration, a
+                        CompiledFlow shared with other sessions, or the path to
+                        a compiled flow artifact
             task: PipelineTask instance used to queue frames
             llm: LLM service for handling functions
             tts: Optional TTS service for voice actions
+            context: LLM context of the pipeline. Required, with direct_context,
+                    by the 'window' and 'drop_node_messages' context strategies,
+                    which rewrite the conversation history.
+            processor: Optional FlowProcessor placed in the pipeline to inject
+                    frames next to the context aggregator instead of queueing
+                    them at the head of the pipeline
+            direct_context: Update the messages and tools of `context` in place
+                    instead of sending frames for the context aggregator to apply
+            fold_into_result: Return the new node's messages as part of the edge
+                    function's result instead of adding them to the context
+                    separately, and set its tools on the function call's context
+                    in place. The inference that runs on the function result then
+                    sees the new node. Messages are folded for nodes with the
+                    'append' strategy.
+            defer_actions: Return edge function results as soon as the node,
+                    context and tools are updated, and run the new node's pre-
+                    and post-actions in the background while the LLM responds
+            action_executor: Executor running synchronous action handlers.
+                    Defaults to a thread pool of ACTION_THREADS threads shared
+                    by all FlowManagers of the process.
+            background_pool: Pool running the actions with "background": true.
+                    Defaults to the pool shared by all FlowManagers of the
+                    process, see BackgroundActionPool.default().
+            webhook_client: Client sending the built-in `webhook` actions.
+                    Defaults to the client shared by all FlowManagers of the
+                    process, see WebhookClient.default().
+
+        Raises:
+            ValueError: If the flow uses a context strategy that rewrites the
+                history without direct_context, or direct_context is set and no
+                context is given
         """
         self.flow = FlowState(flow_config, llm)
+        if self.flow.flow.needs_history and (context is None or not direct_context):
+            # A frame built from the history reaches the context aggregator after
+            # the edge call was added, and would erase it
+            raise ValueError(
+                "The flow uses a context strategy that rewrites the conversation history, "
+                "pass the LLM context to FlowManager with direct_context=True"
+            )
+        if context is None and direct_context:
+            raise ValueError("direct_context requires the LLM context")
+
         self.initialized = False
         self.task = task
         self.llm = llm
         self.tts = tts
+        self.context = context
+        self.processor = processor
+        self.direct_context = direct_context
+        self.fold_into_result = fold_into_result
+        self.defer_actions = defer_actions
         self.action_handlers: Dict[str, Callable] = {}
+        self.action_executor = action_executor
+        self.background_pool = background_pool or BackgroundActionPool.default()
+        self.webhook_client = webhook_client or WebhookClient.default()
+        self._handlers: Dict[str, ActionHandler] = {}
+        # Pre- and post-actions of the nodes entered so far, bound to their handlers
+        self._action_plans: Dict[str, Tuple[Optional[ActionPlan], Optional[ActionPlan]]] = {}
+        self.metrics = FlowMetrics()
+        self._initial_messages: List[dict] = []
+        # Nodes whose messages are in the LLM context
+        self._context_nodes: Set[str] = set()
+        # Node whose messages were added to the LLM context last
+        self._latest_node: Optional[str] = None
+        # Content hash of the tools last sent to the LLM
+        self._tools_key: Optional[str] = None
+        # Serializes edge transitions, waiting calls are served in arrival order
+        self._transition_lock = asyncio.Lock()
+        # Number of completed transitions, used to detect calls made before one
+        self._generation = 0
+        # Generation when the LLM announced the tool calls of its latest turn, the
+        # turn's context and message count, and whether none of them ran yet
+        self._turn_generation: Optional[int] = None
+        self._turn_key: Optional[Tuple[int, int]] = None
+        self._turn_announced = False
+        # Deferred actions of the latest transition, see defer_actions
+        self._actions_task: Optional[asyncio.Task] = None
+        # Frames of the transition in progress, queued together once it completes
+        self._pending_frames: Optional[List[Frame]] = None
+        # Token of the edge transition holding the lock, see _current_transition
+        self._transition_token: Optional[object] = None
+        # Actions that outlived their timeout and were left running
+        self._background_actions: Set[asyncio.Task] = set()
 
         # Register built-in actions
         self.register_action("tts_say", self._handle_tts_action)
         self.register_action("end_conversation", self._handle_end_action)
+        self.register_action("webhook", self._handle_webhook_action)
 
     async def initialize(self, initial_messages: List[dict]):
         """Initialize the flow with starting messages and functions.
@@ -75,11 +230,23 @@ class FlowManager:
                             to include in the context
         """
         if not self.initialized:
+            self._check_action_types()
             await self.register_functions()
 
+            self._initial_messages = list(initial_messages)
+            self._context_nodes = {self.flow.current_node}
+            self._latest_node = self.flow.current_node
             messages = initial_messages + self.flow.get_current_messages()
-            await self.task.queue_frame(LLMMessagesUpdateFrame(messages=messages))
-            await self.task.queue_frame(LLMSetToolsFrame(tools=self.flow.get_current_functions()))
+            self._pending_frames = []
+            try:
+                await self._set_messages(messages)
+                await self._set_tools(self.flow.get_current_functions())
+            finally:
+                frames, self._pending_frames = self._pending_frames, None
+                if frames:
+                    await self._queue_frames(frames)
+            self._tools_key = self.flow.get_current_tools_key()
+            self.metrics.tools_updates_sent += 1
             self.initialized = True
             logger.debug(f"Initialized flow at node: {self.flow.current_node}")
         else:
@@ -89,84 +256,292 @@ class FlowManager:
         """Register edge functions from the flow configuration with the LLM service.
 
         This method:
-        1. Gets all available function names across all nodes using the format parser
+        1. Gets the edge and node function names from the compiled flow's graph indexes
         2. For node functions (names that don't match node names):
             - Expects them to be already registered with the LLM
-            - Logs their presence but doesn't register them
+            - Warns about any without a handler, but doesn't register them
         3. For edge functions (names that match node names):
             - Registers them with the LLM using handle_edge_function
             - These trigger state transitions when called
         """
-        registered_handlers = set()
+
+        async def start_edge_function(function_name, llm, context):
+            # Services such as OpenAI's announce every tool call of a turn while
+            # streaming it, before running them one after another. All calls of
+            # the turn were chosen from the node the flow was at by then.
+            key = (id(context), len(context.messages))
+            if not self._turn_announced or key != self._turn_key:
+                self._turn_generation = self._generation
+                self._turn_key = key
+                self._turn_announced = True
 
         async def handle_edge_function(
             function_name, tool_call_id, arguments, llm, context, result_callback
         ):
-            await self.handle_transition(function_name)
-            await result_callback("Acknowledged")
-
-        # Get all available function names across all nodes safely
-        all_functions = self.flow.get_all_available_function_names()
-
-        # Register each function
-        for function_name in all_functions:
-            # Skip if already registered
-            if function_name in registered_handlers:
-                continue
-
-            # Check if this is a node function (doesn't match any node name)
-            is_node_function = function_name not in self.flow.nodes
-
-            if is_node_function:
-                # Don't override existing node function handlers
-                if not hasattr(
-                    self.llm, "has_function_handler"
-                ) or not self.llm.has_function_handler(function_name):
-                    logger.debug(f"Found node function: {function_name}")
+            fold_context = context if self.fold_into_result else None
+            self._turn_announced = False
+            folded = await self._transition(
+                function_name,
+                fold_context,
+                defer_actions=self.defer_actions,
+                generation=self._turn_generation,
+            )
+            if folded is None:
+                # The call was dropped, so the LLM mustn't take it for a transition
+                await result_callback(
+                    {
+                        "status": "not_transitioned",
+                        "message": "Not transitioned, the flow is at node "
+                        f"'{self.flow.current_node}'",
+                    }
+                )
+            elif folded:
+                # The new node's instructions reach the LLM with the function result,
+                # in the inference that runs once the result is added to the context
+                instructions = "\n\n".join(message_text(m) for m in folded)
+                await result_callback({"status": "Acknowledged", "instructions": instructions})
             else:
-                # Register edge function handler
-                self.llm.register_function(function_name, handle_edge_function)
-                logger.debug(f"Registered edge function: {function_name}")
+                await result_callback("Acknowledged")
 
-            registered_handlers.add(function_name)
+        compiled_flow = self.flow.flow
 
-    def register_action(self, action_type: str, handler: Callable):
+        for function_name in compiled_flow.function_names - compiled_flow.edge_functions:
+            # Node functions reference handlers that live outside the flow config,
+            # so they can only be checked once the LLM is known
+            if self.llm.has_function(function_name):
+                logger.debug(f"Found node function: {function_name}")
+            else:
+                logger.warning(f"Node function '{function_name}' has no handler registered")
+
+        for function_name in compiled_flow.edge_functions:
+            self.llm.register_function(
+                function_name, handle_edge_function, start_callback=start_edge_function
+            )
+            logger.debug(f"Registered edge function: {function_name}")
+
+    def register_action(self, action_type: str, handler: Callable, offload: bool = True):
         """Register a handler for a specific action type.
 
+        Synchronous handlers run on `action_executor`, so blocking calls such as
+        database writes or file I/O don't stall the event loop.
+
         Args:
             action_type: String identifier for the action (e.g., "tts_say")
             handler: Async or sync function that handles the action.
                     Should accept action configuration as parameter.
+            offload: Run a synchronous handler on the action executor. Pass
+                    False for quick handlers that must run on the event loop.
         """
         if not callable(handler):
             raise ValueError("Action handler must be callable")
         self.action_handlers[action_type] = handler
+        is_async = iscoroutinefunction(handler)
+        self._handlers[action_type] = ActionHandler(handler, is_async, offload and not is_async)
+        # Plans bound to the previous handler are bound again on next use
+        self._action_plans.clear()
+
+    def _check_action_types(self):
+        """Check that every action type used by the flow has a handler.
+
+        Raises:
+            ValueError: If the flow uses an action type with no registered handler
+        """
+        if self.flow.flow.action_types <= self._handlers.keys():
+            return
+        # Binding the nodes' actions reports where the unknown type is used
+        for node_id in self.flow.nodes:
+            self._get_action_plans(node_id)
+
+    def _get_action_plans(self, node_id: str) -> Tuple[Optional[ActionPlan], Optional[ActionPlan]]:
+        """Get a node's pre- and post-actions bound to their handlers.
+
+        Nodes are bound when first entered, so a session only holds the plans of
+        the nodes it visits.
+
+        Args:
+            node_id: ID of the node
+
+        Returns:
+            Bound pre-actions and post-actions, or None for an empty list
+
+        Raises:
+            ValueError: If an action type has no registered handler
+        """
+        plans = self._action_plans.get(node_id)
+        if plans is None:
+            node = self.flow.nodes[node_id]
+            plans = self._action_plans[node_id] = tuple(
+                bind_actions(actions, self._handlers, f"$.nodes.{node_id}.{field}")
+                if actions
+                else None
+                for field, actions in (
+                    ("pre_actions", node.pre_actions),
+                    ("post_actions", node.post_actions),
+                )
+            )
+        return plans
 
-    async def _execute_actions(self, actions: Optional[List[dict]]) -> None:
+    async def _execute_actions(
+        self, plan: Optional[ActionPlan], timeout: Optional[float] = None
+    ) -> float:
         """Execute actions specified for the current node.
 
+        Actions run one after another, unless they set "concurrent": true or
+        'depends_on' (see action_dependencies), in which case each action starts
+        as soon as the actions it waits for are done. All actions are done when
+        this returns, except those an overrun timeout moved to the background.
+
         Args:
-            actions: List of action configurations to execute
+            plan: Bound actions to execute
+            timeout: Seconds the actions may take in total. An action still
+                    running when they are up is handled like one overrunning
+                    its own 'timeout'.
+
+        Returns:
+            Critical-path time of the actions in seconds: the longest chain of
+            actions waiting for each other, which is how long they took overall
+        """
+        if not plan:
+            return 0.0
+        actions = plan.actions
+
+        deadline = None if timeout is None else time.perf_counter() + timeout
+
+        if plan.dependencies is None:
+            start = time.perf_counter()
+            for action in actions:
+                await self._execute_action(action, deadline)
+            return time.perf_counter() - start
+
+        dependencies = plan.dependencies
+        finish_times: List[float] = [0.0] * len(actions)
+        tasks: List[asyncio.Task] = []
+
+        async def run(index: int):
+            waits_for = dependencies[index]
+            if waits_for:
+                await asyncio.wait([tasks[i] for i in waits_for])
+            start = time.perf_counter()
+            await self._execute_action(actions[index], deadline)
+            finish_times[index] = max((finish_times[i] for i in waits_for), default=0.0) + (
+                time.perf_counter() - start
+            )
+
+        loop = asyncio.get_running_loop()
+        tasks.extend(loop.create_task(run(index)) for index in range(len(actions)))
+        await asyncio.gather(*tasks)
+        return max(finish_times)
 
-        Note:
-            Each action must have a 'type' field matching a registered handler
+    async def _execute_action(self, bound: BoundAction, deadline: Optional[float] = None):
+        """Execute a single action, or queue it to the background pool.
+
+        Args:
+            bound: Action to execute, bound to its handler
+            deadline: time.perf_counter() value by which the node's actions must
+                     be done, if the node has a time budget. Background actions
+                     are not part of the budget.
         """
-        if not actions:
+        if not bound.background:
+            await self._run_action(bound, deadline)
             return
 
-        for action in actions:
-            action_type = action["type"]
-            if action_type in self.action_handlers:
-                handler = self.action_handlers[action_type]
-                try:
-                    if iscoroutinefunction(handler):
-                        await handler(action)
-                    else:
-                        handler(action)
-                except Exception as e:
-                    logger.warning(f"Error executing action {action_type}: {e}")
+        async def job():
+            # Workers run outside of the transition that queued the action
+            _current_transition.set(None)
+            await self._run_action(bound)
+
+        self.metrics.background_actions += 1
+        if not await self.background_pool.submit(job):
+            self.metrics.background_actions_dropped += 1
+
+    async def _run_action(self, bound: BoundAction, deadline: Optional[float] = None):
+        """Run a single action with its registered handler.
+
+        An action with a 'timeout', or running under a node's time budget, runs in
+        its own task. If it overruns, it is cancelled, or left running in the
+        background with "on_timeout": "background". Its 'fallback' action runs when
+        it fails, or is cancelled for overrunning, within what is left of the node's
+        time budget. An action left running in the background may still complete,
+        so its fallback doesn't run. Timeouts stop waiting for synchronous handlers,
+        but can't interrupt their thread.
+
+        Args:
+            bound: Action to execute, bound to its handler
+            deadline: time.perf_counter() value by which the node's actions must
+                     be done, if the node has a time budget
+        """
+        action = bound.action
+        action_type = action["type"]
+        timeout = action.get("timeout")
+        if deadline is not None:
+            remaining = max(deadline - time.perf_counter(), 0.0)
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        start = time.perf_counter()
+        left_running = False
+        if timeout is None:
+            completed = await self._call_action_handler(bound)
+        else:
+            task = asyncio.get_running_loop().create_task(self._call_action_handler(bound))
+            try:
+                done, _ = await asyncio.wait({task}, timeout=timeout)
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+
+            completed = bool(done) and task.result()
+            if not done:
+                self.metrics.action_timeouts[action_type] = (
+                    self.metrics.action_timeouts.get(action_type, 0) + 1
+                )
+                if action.get("on_timeout") == "background":
+                    logger.warning(
+                        f"Action {action_type} exceeded {timeout:.2f}s, "
+                        "leaving it running in the background"
+                    )
+                    self._background_actions.add(task)
+                    task.add_done_callback(self._background_actions.discard)
+                    left_running = True
+                else:
+                    logger.warning(f"Action {action_type} exceeded {timeout:.2f}s, cancelling it")
+                    task.cancel()
+
+        self.metrics.action_runs[action_type] = self.metrics.action_runs.get(action_type, 0) + 1
+        self.metrics.action_time[action_type] = self.metrics.action_time.get(action_type, 0.0) + (
+            time.perf_counter() - start
+        )
+
+        if not completed and not left_running and bound.fallback is not None:
+            logger.debug(
+                f"Running fallback action {bound.fallback.action['type']} for {action_type}"
+            )
+            await self._run_action(bound.fallback, deadline)
+
+    async def _call_action_handler(self, bound: BoundAction) -> bool:
+        """Call an action handler, logging its errors.
+
+        Args:
+            bound: Action to pass to its handler
+
+        Returns:
+            Whether the handler completed without raising an exception
+        """
+        handler, action = bound.handler, bound.action
+        try:
+            if handler.is_async:
+                await handler.handler(action)
+            elif handler.offload:
+                executor = self.action_executor or _default_action_executor()
+                await asyncio.get_running_loop().run_in_executor(executor, handler.handler, action)
             else:
-                logger.warning(f"No handler registered for action type: {action_type}")
+                handler.handler(action)
+            return True
+        except Exception as e:
+            logger.warning(f"Error executing action {action['type']}: {e}")
+            self.metrics.action_errors[action["type"]] = (
+                self.metrics.action_errors.get(action["type"], 0) + 1
+            )
+            return False
 
     async def _handle_tts_action(self, action: dict):
         """Built-in handler for TTS actions that speak immediately.
@@ -184,7 +559,7 @@ class FlowManager:
             await self.tts.say(action["text"])
         else:
             # Fall back to queued TTS if no direct service available
-            await self.task.queue_frame(TTSSpeakFrame(text=action["text"]))
+            await self._queue_frame(TTSSpeakFrame(text=action["text"]))
 
     async def _handle_end_action(self, action: dict):
         """Built-in handler for ending the conversation.
@@ -197,8 +572,225 @@ class FlowManager:
                 Optional 'text' key for a goodbye message.
         """
         if action.get("text"):  # Optional goodbye message
-            await self.task.queue_frame(TTSSpeakFrame(text=action["text"]))
-        await self.task.queue_frame(EndFrame())
+            await self._queue_frame(TTSSpeakFrame(text=action["text"]))
+        await self._queue_frame(EndFrame())
+
+    async def _handle_webhook_action(self, action: dict):
+        """Built-in handler for sending a payload to an HTTP endpoint.
+
+        Args:
+            action: Dictionary containing the action configuration.
+                Must include a 'url' key, see WebhookClient for the options.
+        """
+        await self.webhook_client.send(action)
+
+    async def _queue_frame(self, frame: Frame):
+        """Queue a frame, adding it to the current transition's frames if any.
+
+        Args:
+            frame: Frame to queue
+        """
+        if self._pending_frames is not None:
+            self._pending_frames.append(frame)
+        else:
+            await self._queue_frames([frame])
+
+    async def _queue_frames(self, frames: List[Frame]):
+        """Send frames into the pipeline, keeping their order.
+
+        Frames are injected by the FlowProcessor when one is running, up to the
+        first frame that has to go through the whole pipeline. That frame and
+        the ones after it are queued on the task.
+
+        Args:
+            frames: Frames to send
+        """
+        if self.processor is not None and self.processor.running:
+            injected = 0
+            while injected < len(frames) and self.processor.can_inject(frames[injected]):
+                injected += 1
+            await self.processor.inject_frames(frames[:injected])
+            frames = frames[injected:]
+
+        if frames:
+            await self.task.queue_frames(frames)
+
+    async def _append_messages(self, messages: List[dict]):
+        """Append messages to the LLM context.
+
+        Args:
+            messages: Messages to append
+        """
+        if self.direct_context:
+            self.context.add_messages(messages)
+        else:
+            await self._queue_frame(LLMMessagesAppendFrame(messages=messages))
+
+    async def _set_messages(self, messages: List[dict]):
+        """Replace the messages of the LLM context.
+
+        Args:
+            messages: New context messages
+        """
+        if self.direct_context:
+            self.context.set_messages(messages)
+        else:
+            await self._queue_frame(LLMMessagesUpdateFrame(messages=messages))
+
+    async def _set_tools(self, tools: List[dict]):
+        """Set the tools of the LLM context.
+
+        Args:
+            tools: Tools in the provider-ready format
+        """
+        if self.direct_context:
+            self.context.set_tools(tools)
+        else:
+            await self._queue_frame(LLMSetToolsFrame(tools=tools))
+
+    async def _update_context(self, fold: bool = False) -> List[dict]:
+        """Add the current node's messages to the LLM context.
+
+        Nodes using the default 'append' strategy append their messages. A node
+        re-entered from itself skips them, as they are still the latest node
+        messages, and a node re-entered from another node moves them to the end of
+        the context with direct_context, so looping flows don't grow the context
+        on every visit. Other strategies replace the context with the
+        messages they keep, followed by the node's messages.
+
+        Args:
+            fold: Return the messages of 'append' nodes instead of appending them,
+                for the caller to deliver with the function result
+
+        Returns:
+            Messages left for the caller to deliver
+        """
+        node_id = self.flow.current_node
+        strategy = self.flow.get_current_context_strategy()
+        messages = self.flow.get_current_messages()
+
+        if strategy.type == ContextStrategyType.APPEND:
+            if node_id == self._latest_node:
+                logger.debug(f"Messages of re-entered node {node_id} are already the latest")
+                return []
+
+            self._latest_node = node_id
+            if node_id not in self._context_nodes or not self.direct_context:
+                self._context_nodes.add(node_id)
+                if fold:
+                    return messages
+                await self._append_messages(messages)
+            elif messages:
+                logger.debug(f"Moving messages of re-entered node {node_id} to the context end")
+                texts = {message_text(m) for m in messages}
+                history = [
+                    m
+                    for m in self.context.get_messages_for_persistent_storage()
+                    if message_text(m) not in texts
+                ]
+                await self._set_messages(history + messages)
+            return []
+
+        # Strategies reading the history require direct_context: the function call
+        # that led here is added to the context once it returns, after the history
+        # is rewritten in place, so it is kept
+        history = (
+            self.context.get_messages_for_persistent_storage() if strategy.needs_history else []
+        )
+        kept = strategy.apply(history, self._initial_messages, self.flow.flow.node_message_texts)
+        logger.debug(
+            f"Applying '{strategy.type.value}' context strategy: "
+            f"kept {len(kept)} of {len(history)} messages"
+        )
+        await self._set_messages(kept + messages)
+
+        # Only the window strategy can keep messages of earlier nodes
+        kept_nodes = set()
+        if strategy.type == ContextStrategyType.WINDOW:
+            kept_texts = {message_text(m) for m in kept}
+            kept_nodes = {
+                n
+                for n in self._context_nodes
+                if all(message_text(m) in kept_texts for m in self.flow.nodes[n].messages)
+            }
+        self._context_nodes = kept_nodes | {node_id}
+        self._latest_node = node_id
+        return []
+
+    async def _update_tools(self, context: Optional["OpenAILLMContext"] = None):
+        """Set the current node's tools, unless the LLM already has the same tools.
+
+        Args:
+            context: LLM context to set the tools on in place, instead of the
+                default path
+        """
+        tools_key = self.flow.get_current_tools_key()
+        if tools_key == self._tools_key:
+            self.metrics.tools_updates_skipped += 1
+            logger.debug(f"Tools of node {self.flow.current_node} are unchanged")
+            return
+
+        if context is not None:
+            context.set_tools(self.flow.get_current_functions())
+        else:
+            await self._set_tools(self.flow.get_current_functions())
+        self._tools_key = tools_key
+        self.metrics.tools_updates_sent += 1
+
+    def _save_update_state(self) -> Tuple:
+        """Get the state changed by a context and tools update, to withdraw it."""
+        return (
+            set(self._context_nodes),
+            self._latest_node,
+            self._tools_key,
+            self.metrics.tools_updates_sent,
+            self.metrics.tools_updates_skipped,
+        )
+
+    def _restore_update_state(self, state: Tuple):
+        """Restore the state saved by _save_update_state()."""
+        (
+            self._context_nodes,
+            self._latest_node,
+            self._tools_key,
+            self.metrics.tools_updates_sent,
+            self.metrics.tools_updates_skipped,
+        ) = state
+
+    def _run_deferred_actions(
+        self,
+        node_id: str,
+        pre_actions: Optional[ActionPlan],
+        post_actions: Optional[ActionPlan],
+        actions_timeout: Optional[float] = None,
+    ):
+        """Run a node's actions in the background, after those of earlier transitions.
+
+        Args:
+            node_id: ID of the node the actions belong to
+            pre_actions: Pre-actions of the node
+            post_actions: Post-actions of the node
+            actions_timeout: Time budget of the pre-actions and of the post-actions
+        """
+        previous = self._actions_task
+
+        async def run_actions():
+            # The task inherits the context of the transition that created it, but
+            # runs outside of it
+            _current_transition.set(None)
+            if previous is not None:
+                await previous
+            logger.debug(f"Executing deferred actions for node {node_id}")
+            elapsed = await self._execute_actions(pre_actions, actions_timeout)
+            elapsed += await self._execute_actions(post_actions, actions_timeout)
+            self.metrics.actions_critical_path[node_id] = elapsed
+
+        self._actions_task = asyncio.get_running_loop().create_task(run_actions())
+
+    async def wait_for_actions(self):
+        """Wait until the deferred actions of all transitions so far have run."""
+        if self._actions_task is not None:
+            await self._actions_task
 
     async def handle_transition(self, function_name: str):
         """Handle the execution of functions and potential node transitions.
@@ -223,8 +815,16 @@ class FlowManager:
         1. Validates the function call against available functions
         2. Executes pre-actions of the new node
         3. Updates the LLM context with new messages
-        4. Updates available tools for the new node (via LLMSetToolsFrame)
+        4. Updates available tools for the new node (via LLMSetToolsFrame), unless
+           they are the same as the previous node's tools. With direct_context,
+           steps 3 and 4 update the context in place instead of sending frames.
         5. Executes post-actions of the new node
+        6. Sends the frames from steps 2-5 into the pipeline together, in order
+
+        The context and tools update is prepared after the post-actions have run.
+        If an action starts another transition, the node is left before the LLM
+        ever sees it: the actions of every node still run, but only the final
+        node's context and tools are sent.
 
         Args:
             function_name: Name of the function to execute
@@ -232,40 +832,163 @@ class FlowManager:
         Raises:
             RuntimeError: If handle_transition is called before initialization
         """
+        await self._transition(function_name)
+
+    async def _transition(
+        self,
+        function_name: str,
+        fold_context: Optional["OpenAILLMContext"] = None,
+        defer_actions: bool = False,
+        generation: Optional[int] = None,
+    ) -> Optional[List[dict]]:
+        """Handle a function call, transitioning to a new node for edge functions.
+
+        Args:
+            function_name: Name of the function to execute
+            fold_context: LLM context of the edge function call. If given, the new
+                node's tools are set on it in place and its messages are returned
+                instead of being added to the context, see fold_into_result
+            defer_actions: Run the new node's actions in the background instead
+                of before and after the context update, see defer_actions
+            generation: Number of transitions completed when the LLM chose the
+                edge call. Defaults to the number when the call arrives.
+
+        Returns:
+            Messages of the new node to deliver with the function result, or None
+            if the edge call was dropped or the current node doesn't offer it
+
+        Raises:
+            RuntimeError: If called before initialization
+        """
         if not self.initialized:
             raise RuntimeError("FlowManager must be initialized before handling transitions")
 
-        available_functions = self.flow.get_available_function_names()
+        # Node functions don't change the state, so they don't wait for transitions.
+        # Neither do transitions started by an action of the transition in progress,
+        # which holds the lock.
+        in_transition = self._transition_token is not None and (
+            _current_transition.get() is self._transition_token
+        )
+        if function_name not in self.flow.flow.edge_functions or in_transition:
+            return await self._run_transition(function_name, fold_context, defer_actions)
+
+        if generation is None:
+            generation = self._generation
+        async with self._transition_lock:
+            # An edge call chosen before another transition completed was chosen
+            # from the tools of a node the flow has left, e.g. a duplicate or
+            # competing call among the parallel calls of one LLM turn
+            if self._generation != generation:
+                logger.warning(
+                    f"Dropping edge call '{function_name}': the flow moved to node "
+                    f"'{self.flow.current_node}' after the call was made"
+                )
+                self.metrics.transitions_dropped += 1
+                return None
+
+            self._transition_token = object()
+            token = _current_transition.set(self._transition_token)
+            try:
+                return await self._run_transition(function_name, fold_context, defer_actions)
+            finally:
+                _current_transition.reset(token)
+                self._transition_token = None
+
+    async def _run_transition(
+        self,
+        function_name: str,
+        fold_context: Optional["OpenAILLMContext"],
+        defer_actions: bool,
+    ) -> Optional[List[dict]]:
+        """Run a function call's transition, see _transition().
 
-        if function_name not in available_functions:
-            logger.warning(
-                f"Received invalid function call '{function_name}' for node '{self.flow.current_node}'. "
-                f"Available functions are: {available_functions}"
-            )
-            return
+        Args:
+            function_name: Name of the function to execute
+            fold_context: LLM context of the edge function call, for folding
+            defer_actions: Run the new node's actions in the background
+
+        Returns:
+            Messages of the new node to deliver with the function result, or None if
+            the current node doesn't offer the edge function
+        """
 
-        # Attempt transition - returns new node ID for edge functions,
-        # None for node functions
+        # Attempt transition - returns new node ID for edge functions, None for
+        # node functions and functions the current node doesn't offer
         new_node = self.flow.transition(function_name)
+        if new_node is None and function_name in self.flow.flow.edge_functions:
+            return None
+        folded = []
 
         # Only perform node transition logic if we got a new node
         # (meaning it was an edge function, not a node function)
         if new_node is not None:
-            # Execute pre-actions before updating LLM context
-            if self.flow.get_current_pre_actions():
-                logger.debug(f"Executing pre-actions for node {new_node}")
-                await self._execute_actions(self.flow.get_current_pre_actions())
-
-            # Update LLM context and tools
-            current_messages = self.flow.get_current_messages()
-            await self.task.queue_frame(LLMMessagesAppendFrame(messages=current_messages))
-            await self.task.queue_frame(LLMSetToolsFrame(tools=self.flow.get_current_functions()))
-
-            # Execute post-actions after updating LLM context
-            if self.flow.get_current_post_actions():
-                logger.debug(f"Executing post-actions for node {new_node}")
-                await self._execute_actions(self.flow.get_current_post_actions())
+            pre_actions, post_actions = self._get_action_plans(new_node)
+            actions_timeout = self.flow.get_current_actions_timeout()
+
+            # Collect the transition's frames and queue them together, so no other
+            # frame is queued in the middle of the transition. Transitions started
+            # by its actions add their frames to the same batch.
+            outermost = self._pending_frames is None
+            if outermost:
+                self._pending_frames = []
+            else:
+                # The enclosing transition's node is left before the LLM runs, so
+                # only the node this transition ends in gets its context and tools
+                self.metrics.context_updates_coalesced += 1
+            try:
+                actions_time = 0.0
+                generation = self._generation
+
+                # Execute pre-actions before updating LLM context
+                if pre_actions and not defer_actions:
+                    logger.debug(f"Executing pre-actions for node {new_node}")
+                    actions_time += await self._execute_actions(pre_actions, actions_timeout)
+                update_at = len(self._pending_frames)
+
+                # Update LLM context and tools, unless a pre-action moved the flow on
+                saved = None
+                if outermost and self._generation == generation:
+                    saved = self._save_update_state()
+                    folded = await self._update_context(fold=fold_context is not None)
+                    await self._update_tools(fold_context)
+                    update_end = len(self._pending_frames)
+
+                # Execute post-actions after updating LLM context
+                if post_actions and not defer_actions:
+                    logger.debug(f"Executing post-actions for node {new_node}")
+                    actions_time += await self._execute_actions(post_actions, actions_timeout)
+
+                if (pre_actions or post_actions) and not defer_actions:
+                    self.metrics.actions_critical_path[new_node] = actions_time
+
+                # If an action moved the flow on, the node the flow ends in gets its
+                # context and tools, placed where this node's would have been. The
+                # update of the node that was left is withdrawn unless it was
+                # already applied to the context in place.
+                if outermost and self._generation != generation:
+                    if saved is not None and not self.direct_context:
+                        del self._pending_frames[update_at:update_end]
+                        self._restore_update_state(saved)
+                    action_frames, self._pending_frames = self._pending_frames, []
+                    folded = await self._update_context(fold=fold_context is not None)
+                    await self._update_tools(fold_context)
+                    self._pending_frames = (
+                        action_frames[:update_at] + self._pending_frames + action_frames[update_at:]
+                    )
+            finally:
+                if outermost:
+                    frames, self._pending_frames = self._pending_frames, None
+                    if frames:
+                        await self._queue_frames(frames)
+
+            if defer_actions and (pre_actions or post_actions):
+                self._run_deferred_actions(new_node, pre_actions, post_actions, actions_timeout)
+
+            self._generation += 1
+            self.metrics.transitions += 1
 
             logger.debug(f"Transition to node {new_node} complete")
         else:
             logger.debug(f"Node function {function_name} executed without transition")
+
+        return folded
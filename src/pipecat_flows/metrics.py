@@ -0,0 +1,93 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+from dataclasses import dataclass, field
+from typing import Dict
+
+
+@dataclass
+class FlowMetrics:
+    """Counters collected by a FlowManager over its conversation.
+
+    Attributes:
+        transitions: Number of completed node transitions
+        transitions_dropped: Number of edge calls dropped because the flow had
+            already transitioned after they were made
+        tools_updates_sent: Number of LLMSetToolsFrame updates queued
+        tools_updates_skipped: Number of tools updates skipped because the new
+            node exposes the same tools as the previous one
+        context_updates_coalesced: Number of context and tools updates not sent
+            because an action of the node moved the flow on to another node
+        actions_critical_path: Seconds the pre- and post-actions of each node
+            took on their latest run. Actions running concurrently count once.
+        action_runs: Number of actions run, per action type
+        action_time: Total seconds actions took, per action type. An action
+            that timed out counts until its timeout.
+        action_timeouts: Number of actions that overran their timeout or their
+            node's budget, per action type
+        action_errors: Number of actions whose handler raised, per action type
+        background_actions: Number of actions queued to the background pool
+        background_actions_dropped: Number of background actions dropped
+            because the pool's queue was full
+    """
+
+    transitions: int = 0
+    transitions_dropped: int = 0
+    tools_updates_sent: int = 0
+    tools_updates_skipped: int = 0
+    context_updates_coalesced: int = 0
+    actions_critical_path: Dict[str, float] = field(default_factory=dict)
+    action_runs: Dict[str, int] = field(default_factory=dict)
+    action_time: Dict[str, float] = field(default_factory=dict)
+    action_timeouts: Dict[str, int] = field(default_factory=dict)
+    action_errors: Dict[str, int] = field(default_factory=dict)
+    background_actions: int = 0
+    background_actions_dropped: int = 0
+
+
+@dataclass
+class BackgroundMetrics:
+    """Counters collected by a BackgroundActionPool over all its sessions.
+
+    Attributes:
+        submitted: Number of actions submitted to the pool
+        completed: Number of actions run
+        failed: Number of actions that raised while running
+        dropped: Number of actions dropped because the queue was full
+        spilled: Number of actions kept in the overflow buffer because the
+            queue was full
+        blocked: Number of submissions that waited for a free queue slot
+        blocked_time: Total seconds submissions waited for a free queue slot
+        max_pending: Highest number of actions waiting for a worker at once
+    """
+
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    dropped: int = 0
+    spilled: int = 0
+    blocked: int = 0
+    blocked_time: float = 0.0
+    max_pending: int = 0
+
+
+@dataclass
+class WebhookMetrics:
+    """Counters collected by a WebhookClient over all its sessions.
+
+    Attributes:
+        events: Number of webhook payloads sent
+        requests: Number of HTTP requests made, including retries
+        batches: Number of requests that sent a batch of payloads
+        retries: Number of requests retried after a failure
+        failures: Number of sends that failed after all retries
+    """
+
+    events: int = 0
+    requests: int = 0
+    batches: int = 0
+    retries: int = 0
+    failures: int = 0
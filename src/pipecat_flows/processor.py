@@ -0,0 +1,87 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+from typing import Sequence
+
+from pipecat.frames.frames import CancelFrame, EndFrame, Frame, StartFrame
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+
+class FlowProcessor(FrameProcessor):
+    """Pass-through processor that injects a FlowManager's frames into the pipeline.
+
+    Without a processor, FlowManager queues its frames on the PipelineTask, so they
+    travel from the head of the pipeline through the transport input, STT and any
+    other processor before reaching the context aggregator. With a FlowProcessor
+    placed right before the user context aggregator (which consumes the context
+    and tools frames on behalf of the LLM), the frames start there instead:
+
+        pipeline = Pipeline(
+            [
+                transport.input(),
+                stt,
+                flow_processor,
+                context_aggregator.user(),
+                llm,
+                ...
+            ]
+        )
+        flow_manager = FlowManager(flow_config, task, llm, tts, processor=flow_processor)
+
+    Frames that have to go through the whole pipeline, such as EndFrame, are still
+    queued on the task.
+    """
+
+    def __init__(self, **kwargs):
+        """Initialize the processor.
+
+        Args:
+            **kwargs: Arguments passed to FrameProcessor
+        """
+        super().__init__(**kwargs)
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        """Whether the pipeline is running, so frames can be injected."""
+        return self._running
+
+    @staticmethod
+    def can_inject(frame: Frame) -> bool:
+        """Check whether a frame can be injected in the middle of the pipeline.
+
+        Args:
+            frame: Frame to check
+
+        Returns:
+            False for frames every processor of the pipeline must receive
+        """
+        return not isinstance(frame, (StartFrame, EndFrame, CancelFrame))
+
+    async def inject_frames(self, frames: Sequence[Frame]):
+        """Push frames downstream from this processor, keeping their order.
+
+        Args:
+            frames: Frames to push
+        """
+        for frame in frames:
+            await self.push_frame(frame)
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        """Pass every frame through, tracking whether the pipeline is running.
+
+        Args:
+            frame: Frame to process
+            direction: Direction the frame is travelling in
+        """
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, StartFrame):
+            self._running = True
+        elif isinstance(frame, (EndFrame, CancelFrame)):
+            self._running = False
+
+        await self.push_frame(frame, direction)
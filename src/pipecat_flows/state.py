@@ -4,32 +4,15 @@
 # SPDX-License-Identifier: BSD 2-Clause License
 #
 
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Set
+import copy
+import os
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Sequence, Union
 
 from loguru import logger
 
-from .formats import LLMFormatParser, LLMProvider
-
-
-@dataclass
-class NodeConfig:
-    """Configuration for a single node in the flow.
-
-    A node represents a state in the conversation flow, containing all the
-    information needed for that particular point in the conversation.
-
-    Attributes:
-        messages: List of message dicts in provider-specific format
-        functions: List of function definitions in provider-specific format
-        pre_actions: Optional list of actions to execute before LLM inference
-        post_actions: Optional list of actions to execute after LLM inference
-    """
-
-    messages: List[dict]
-    functions: List[dict]
-    pre_actions: Optional[List[dict]] = None
-    post_actions: Optional[List[dict]] = None
+from .compiler import CompiledFlow, NodeConfig
+from .context import ContextStrategy
+from .formats import LLMFormatParser
 
 
 class FlowState:
@@ -40,58 +23,59 @@ class FlowState:
     pre- and post-actions. It manages transitions between nodes based on function calls
     and handles both node and edge functions.
 
+    The node graph itself lives in a shared CompiledFlow, so a FlowState only holds
+    per-session data and stays small no matter how large the flow is.
+
     Attributes:
-        nodes: Dictionary mapping node IDs to their configurations
+        flow: Compiled flow shared by all sessions running the same configuration
         current_node: ID of the currently active node
         provider: LLM provider type for format parsing
+        adapter: Format adapter bound to the LLM's provider
     """
 
-    def __init__(self, flow_config: dict, llm):
+    __slots__ = ("flow", "current_node", "provider", "adapter")
+
+    def __init__(self, flow_config: Union[dict, CompiledFlow, str, os.PathLike], llm):
         """Initialize the conversation flow.
 
         Args:
             flow_config: Dictionary containing the complete flow configuration,
-                        must include 'initial_node' and 'nodes' keys
+                        must include 'initial_node' and 'nodes' keys, an already
+                        compiled flow to share with other sessions, or the path to
+                        a compiled flow artifact. Dictionaries are compiled once
+                        and shared, see CompiledFlow.from_config().
             llm: LLM service instance for determining provider type
 
         Raises:
             ValueError: If required configuration keys are missing
         """
-        self.nodes: Dict[str, NodeConfig] = {}
-        self.current_node: str = flow_config["initial_node"]
-        self.provider = LLMFormatParser.get_provider(llm)
-        self._load_config(flow_config)
+        self.adapter = LLMFormatParser.get_llm_adapter(llm)
+        self.provider = self.adapter.provider
 
-    def _load_config(self, config: dict):
-        """Load and validate the flow configuration.
+        if isinstance(flow_config, (str, os.PathLike)):
+            flow_config = CompiledFlow.load(flow_config)
 
-        Args:
-            config: Dictionary containing the flow configuration
+        if isinstance(flow_config, CompiledFlow):
+            # Reuse the compiled flow, converting its tools if it targets another provider
+            self.flow = flow_config.for_provider(self.provider)
+        else:
+            self.flow = CompiledFlow.from_config(flow_config, self.provider)
 
-        Raises:
-            ValueError: If required configuration keys are missing
-        """
-        if "initial_node" not in config:
-            raise ValueError("Flow config must specify 'initial_node'")
-        if "nodes" not in config:
-            raise ValueError("Flow config must specify 'nodes'")
-
-        for node_id, node_config in config["nodes"].items():
-            self.nodes[node_id] = NodeConfig(
-                messages=node_config["messages"],
-                functions=node_config["functions"],
-                pre_actions=node_config.get("pre_actions"),
-                post_actions=node_config.get("post_actions"),
-            )
+        self.current_node: str = self.flow.initial_node
+
+    @property
+    def nodes(self) -> Mapping[str, NodeConfig]:
+        """Read-only mapping of node IDs to their configurations."""
+        return self.flow.nodes
 
     def get_current_messages(self) -> List[dict]:
         """Get the messages for the current node.
 
         Returns:
-            List of message dictionaries for the current node in provider-specific format
+            List of message dictionaries for the current node in provider-specific format.
+            The messages are copies, as LLM contexts may modify the messages they hold.
         """
-        messages = self.nodes[self.current_node].messages
-        return messages
+        return copy.deepcopy(list(self.nodes[self.current_node].messages))
 
     def get_current_functions(self) -> List[dict]:
         """Get the available functions for the current node.
@@ -100,59 +84,62 @@ class FlowState:
             List of function definitions available for the current node in provider-specific
                 format
         """
-        functions = self.nodes[self.current_node].functions
+        return list(self.nodes[self.current_node].tools)
 
-        if self.provider == LLMProvider.GEMINI:
-            # For Gemini, combine all function declarations into a single tools object
-            all_declarations = []
-            for func in functions:
-                if "function_declarations" in func:
-                    all_declarations.extend(func["function_declarations"])
-            return [{"function_declarations": all_declarations}] if all_declarations else []
+    def get_current_tools_key(self) -> str:
+        """Get the content hash of the current node's tools.
 
-        return functions
+        Returns:
+            Hash that is equal for nodes exposing the same tools
+        """
+        return self.nodes[self.current_node].tools_key
 
-    def get_current_pre_actions(self) -> Optional[List[dict]]:
+    def get_current_pre_actions(self) -> Optional[Sequence[dict]]:
         """Get the pre-actions for the current node.
 
         Pre-actions are executed before updating the LLM context when
         transitioning to this node.
 
         Returns:
-            List of pre-actions to execute, or None if no pre-actions
+            Pre-actions to execute, or None if no pre-actions
         """
         return self.nodes[self.current_node].pre_actions
 
-    def get_current_post_actions(self) -> Optional[List[dict]]:
+    def get_current_post_actions(self) -> Optional[Sequence[dict]]:
         """Get the post-actions for the current node.
 
         Post-actions are executed after updating the LLM context when
         transitioning to this node.
 
         Returns:
-            List of post-actions to execute, or None if no post-actions
+            Post-actions to execute, or None if no post-actions
         """
         return self.nodes[self.current_node].post_actions
 
-    def get_available_function_names(self) -> Set[str]:
-        """Get the names of available functions for the current node.
+    def get_current_context_strategy(self) -> ContextStrategy:
+        """Get the context strategy for the current node.
 
         Returns:
-            Set of function names that can be called from the current node
+            Strategy deciding how the LLM context changes when entering the node
         """
-        functions = self.nodes[self.current_node].functions
+        return self.nodes[self.current_node].context_strategy
 
-        if self.provider == LLMProvider.GEMINI:
-            # Flatten Gemini's nested function declarations
-            flattened = []
-            for func in functions:
-                if "function_declarations" in func:
-                    flattened.extend(func["function_declarations"])
-            functions = flattened
+    def get_current_actions_timeout(self) -> Optional[float]:
+        """Get the time budget of the current node's actions.
 
-        names = {LLMFormatParser.get_function_name(self.provider, f) for f in functions}
-        logger.debug(f"Available function names for node {self.current_node}: {names}")
-        return names
+        Returns:
+            Seconds the pre-actions, and then the post-actions, may take in total,
+            or None if unlimited
+        """
+        return self.nodes[self.current_node].actions_timeout
+
+    def get_available_function_names(self) -> FrozenSet[str]:
+        """Get the names of available functions for the current node.
+
+        Returns:
+            Set of function names that can be called from the current node
+        """
+        return self.nodes[self.current_node].function_names
 
     def get_function_name_from_call(self, function_call: Dict[str, Any]) -> str:
         """Extract function name from a function call.
@@ -163,25 +150,15 @@ class FlowState:
         Returns:
             Function name as string
         """
-        return LLMFormatParser.get_function_name(self.provider, function_call)
+        return self.adapter.get_function_name(function_call)
 
-    def get_all_available_function_names(self) -> Set[str]:
+    def get_all_available_function_names(self) -> FrozenSet[str]:
         """Get all function names across all nodes without modifying state.
 
         Returns:
             Set of all unique function names available in any node
         """
-        all_functions = set()
-        current = self.current_node  # Store current node
-
-        try:
-            for node_id in self.nodes.keys():
-                self.current_node = node_id
-                all_functions.update(self.get_available_function_names())
-        finally:
-            self.current_node = current  # Ensure we restore the original node
-
-        return all_functions
+        return self.flow.function_names
 
     def get_function_args_from_call(self, function_call: Dict[str, Any]) -> dict:
         """Extract function arguments from a function call.
@@ -192,7 +169,7 @@ class FlowState:
         Returns:
             Dictionary of function arguments
         """
-        return LLMFormatParser.get_function_args(self.provider, function_call)
+        return self.adapter.get_function_args(function_call)
 
     def transition(self, function_name: str) -> Optional[str]:
         """Attempt to transition to a new node based on a function call.
@@ -210,15 +187,17 @@ class FlowState:
             str | None: The ID of the new node if a transition occurred (edge function),
                     or None if no transition should occur (node function or invalid function)
         """
-        available_functions = self.get_available_function_names()
-        logger.debug(f"Attempting transition from {self.current_node} to {function_name}")
+        node = self.nodes[self.current_node]
 
-        if function_name not in available_functions:
-            logger.warning(f"Function {function_name} not available in current node")
+        if function_name not in node.function_names:
+            logger.warning(
+                f"Received invalid function call '{function_name}' for node "
+                f"'{self.current_node}'. Available functions are: {node.function_names}"
+            )
             return None
 
         # Only transition if the function name matches a node name (edge function)
-        if function_name in self.nodes:
+        if function_name in node.edge_functions:
             previous_node = self.current_node
             self.current_node = function_name
             logger.info(f"Transitioned from {previous_node} to node: {self.current_node}")
@@ -0,0 +1,177 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Set
+
+if TYPE_CHECKING:
+    from .compiler import CompiledFlow
+
+
+class FlowValidator:
+    """Validates and analyzes a compiled flow.
+
+    This is the runtime counterpart of the editor's FlowValidator. It runs once when
+    a flow is compiled, so problems in the configuration surface at startup instead
+    of during a live conversation. All graph checks are linear in the number of
+    nodes and edges.
+
+    Errors make the flow unusable and are raised by CompiledFlow. Warnings point at
+    flows that will run, but may never reach their end:
+    - Nodes that cannot be reached from the initial node
+    - Groups of nodes that can't be left once entered and never end the conversation
+    - Nodes with no path to an 'end_conversation' action
+
+    Attributes:
+        errors: Validation error messages from the last validate() call
+        warnings: Analysis warning messages from the last validate() call
+    """
+
+    def __init__(self, flow: "CompiledFlow"):
+        """Initialize the validator.
+
+        Args:
+            flow: Compiled flow to validate
+        """
+        self.flow = flow
+        self.errors: List[str] = []
+        self.warnings: List[str] = []
+
+    def validate(self) -> List[str]:
+        """Perform all validation and analysis checks.
+
+        Returns:
+            List of validation error messages
+        """
+        self.errors = []
+        self.warnings = []
+
+        self._validate_initial_node()
+        self._validate_duplicate_functions()
+
+        # Graph analysis assumes a valid starting point
+        if not self.errors:
+            self._analyze_reachability()
+            self._analyze_exits()
+
+        return self.errors
+
+    def _validate_initial_node(self):
+        """Validate that the initial node exists."""
+        if self.flow.initial_node not in self.flow.nodes:
+            self.errors.append(f"Initial node '{self.flow.initial_node}' not found in nodes")
+
+    def _validate_duplicate_functions(self):
+        """Validate that no node defines the same function more than once."""
+        adapter = self.flow.adapter
+        for node_id, node in self.flow.nodes.items():
+            seen: Set[str] = set()
+            for func in adapter.get_function_definitions(node.functions):
+                name = adapter.get_function_name(func)
+                if name in seen:
+                    self.errors.append(f"Node '{node_id}' defines function '{name}' more than once")
+                seen.add(name)
+
+    def _analyze_reachability(self):
+        """Warn about nodes that can't be reached from the initial node."""
+        reachable = self.flow.reachable_from(self.flow.initial_node)
+        for node_id in self.flow.nodes:
+            if node_id not in reachable:
+                self.warnings.append(f"Node '{node_id}' is unreachable from the initial node")
+
+    def _analyze_exits(self):
+        """Warn about nodes that can never end the conversation."""
+        ending = {
+            node_id
+            for node_id, node in self.flow.nodes.items()
+            if any(
+                action.get("type") == "end_conversation"
+                for actions in (node.pre_actions, node.post_actions)
+                for action in actions or ()
+            )
+        }
+        trapped: Set[str] = set()
+
+        for component in self._strongly_connected_components():
+            if component & ending:
+                continue
+            leaves = any(self.flow.successors[node_id] - component for node_id in component)
+            if leaves:
+                continue
+            trapped.update(component)
+            if len(component) > 1:
+                nodes = ", ".join(f"'{node_id}'" for node_id in sorted(component))
+                self.warnings.append(f"Nodes {nodes} form a cycle with no exit")
+            else:
+                (node_id,) = component
+                self.warnings.append(f"Node '{node_id}' has no exit")
+
+        # Walk edges backwards from the ending nodes
+        can_end = set(ending)
+        stack = list(ending)
+        while stack:
+            for source in self.flow.predecessors[stack.pop()]:
+                if source not in can_end:
+                    can_end.add(source)
+                    stack.append(source)
+
+        for node_id in self.flow.nodes:
+            if node_id not in can_end and node_id not in trapped:
+                self.warnings.append(
+                    f"Node '{node_id}' has no path to an 'end_conversation' action"
+                )
+
+    def _strongly_connected_components(self) -> List[FrozenSet[str]]:
+        """Find the strongly connected components of the node graph.
+
+        Uses an iterative version of Tarjan's algorithm so large flows don't hit
+        the recursion limit.
+
+        Returns:
+            List of components, each a set of node IDs
+        """
+        successors = self.flow.successors
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        on_stack: Set[str] = set()
+        stack: List[str] = []
+        components: List[FrozenSet[str]] = []
+
+        for root in self.flow.nodes:
+            if root in index:
+                continue
+
+            work = [(root, iter(successors[root]))]
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+
+            while work:
+                node_id, targets = work[-1]
+                for target in targets:
+                    if target not in index:
+                        index[target] = lowlink[target] = len(index)
+                        stack.append(target)
+                        on_stack.add(target)
+                        work.append((target, iter(successors[target])))
+                        break
+                    if target in on_stack:
+                        lowlink[node_id] = min(lowlink[node_id], index[target])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node_id])
+                    if lowlink[node_id] == index[node_id]:
+                        component = set()
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.add(member)
+                            if member == node_id:
+                                break
+                        components.append(frozenset(component))
+
+        return components
@@ -0,0 +1,231 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from .metrics import WebhookMetrics
+
+# Batch settings used by actions with "batch": true
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_BATCH_DELAY = 0.05
+
+
+@dataclass
+class _Batch:
+    """Events waiting to be sent to the same endpoint in one request."""
+
+    action: dict
+    events: List[Any] = field(default_factory=list)
+    futures: List[asyncio.Future] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class WebhookClient:
+    """Sends `webhook` actions over a shared keep-alive connection pool.
+
+    A webhook action sends its 'payload' as JSON to its 'url':
+
+        {
+            "type": "webhook",
+            "url": "https://crm.example.com/events",
+            "payload": {"event": "order_confirmed"},
+            "headers": {"Authorization": "Bearer ..."},  # optional
+            "method": "POST",  # optional
+            "retries": 2,  # optional, attempts after the first one
+            "request_timeout": 10,  # optional, seconds per attempt
+            "batch": {"max_size": 20, "max_delay": 0.05},  # optional
+        }
+
+    Connection errors, timeouts, 429 and 5xx responses are retried with
+    exponential backoff. With 'batch', payloads sent to the same endpoint within
+    `max_delay` seconds are sent together as a JSON array, in one request of at
+    most `max_size` payloads. Each action completes when its request does.
+
+    By default the FlowManagers of a process share one client (see default()).
+    aiohttp is imported when the first request is sent.
+
+    Attributes:
+        limit: Maximum number of open connections
+        request_timeout: Default seconds each attempt may take
+        retries: Default number of attempts after the first one
+        backoff: Seconds to wait before the first retry, doubled for each retry
+        metrics: Counters of the requests sent by the client
+    """
+
+    _default: Optional["WebhookClient"] = None
+
+    def __init__(
+        self,
+        limit: int = 100,
+        request_timeout: float = 10.0,
+        retries: int = 2,
+        backoff: float = 0.1,
+    ):
+        """Initialize the client. The connection pool opens on the first request.
+
+        Args:
+            limit: Maximum number of open connections
+            request_timeout: Default seconds each attempt may take
+            retries: Default number of attempts after the first one
+            backoff: Seconds to wait before the first retry, doubled for each retry
+        """
+        self.limit = limit
+        self.request_timeout = request_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.metrics = WebhookMetrics()
+        self._session = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._batches: Dict[Tuple, _Batch] = {}
+        self._sending: Set[asyncio.Task] = set()
+
+    @classmethod
+    def default(cls) -> "WebhookClient":
+        """Get the client shared by the FlowManagers of the process.
+
+        Returns:
+            Client created with the default settings on first use
+        """
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    async def send(self, action: dict):
+        """Send a webhook action's payload, batching it if the action asks for it.
+
+        Args:
+            action: Webhook action configuration
+
+        Raises:
+            ValueError: If the action has no 'url'
+            RuntimeError: If the request failed after all retries
+        """
+        if not isinstance(action.get("url"), str):
+            raise ValueError("Webhook action requires a 'url'")
+
+        payload = action.get("payload", {})
+        batch = action.get("batch")
+        if not batch:
+            self.metrics.events += 1
+            await self._request(action, payload)
+            return
+
+        options = batch if isinstance(batch, dict) else {}
+        max_size = options.get("max_size", DEFAULT_BATCH_SIZE)
+        max_delay = options.get("max_delay", DEFAULT_BATCH_DELAY)
+
+        key = (
+            action.get("method", "POST"),
+            action["url"],
+            tuple(sorted(action.get("headers", {}).items())),
+        )
+        loop = asyncio.get_running_loop()
+        pending = self._batches.get(key)
+        if pending is None:
+            pending = self._batches[key] = _Batch(action)
+            pending.timer = loop.call_later(max_delay, self._flush, key)
+
+        future = loop.create_future()
+        pending.events.append(payload)
+        pending.futures.append(future)
+        if len(pending.events) >= max_size:
+            self._flush(key)
+        await future
+
+    async def close(self):
+        """Close the connection pool."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _flush(self, key: Tuple):
+        """Send the events batched for an endpoint.
+
+        Args:
+            key: Method, URL and headers of the endpoint
+        """
+        batch = self._batches.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+
+        async def send_batch():
+            self.metrics.events += len(batch.events)
+            self.metrics.batches += 1
+            try:
+                await self._request(batch.action, batch.events)
+            except Exception as e:
+                for future in batch.futures:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for future in batch.futures:
+                    if not future.done():
+                        future.set_result(None)
+
+        task = asyncio.get_running_loop().create_task(send_batch())
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    def _get_session(self):
+        """Get the connection pool of the running event loop, opening it if needed."""
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # Sessions belong to one event loop, so a client used from a new loop
+            # opens a new pool
+            self._loop = loop
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.limit))
+        return self._session
+
+    async def _request(self, action: dict, body: Any):
+        """Send a request, retrying failures that may be transient.
+
+        Args:
+            action: Webhook action configuration, for the endpoint and retry options
+            body: JSON body to send
+
+        Raises:
+            RuntimeError: If the request failed after all retries
+        """
+        import aiohttp
+
+        session = self._get_session()
+        url = action["url"]
+        retries = action.get("retries", self.retries)
+        timeout = aiohttp.ClientTimeout(total=action.get("request_timeout", self.request_timeout))
+
+        error: Any = None
+        for attempt in range(retries + 1):
+            if attempt:
+                self.metrics.retries += 1
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                self.metrics.requests += 1
+                async with session.request(
+                    action.get("method", "POST"),
+                    url,
+                    json=body,
+                    headers=action.get("headers"),
+                    timeout=timeout,
+                ) as response:
+                    if response.status < 400:
+                        return
+                    error = f"HTTP {response.status}"
+                    # Other client errors won't succeed on a retry
+                    if response.status < 500 and response.status != 429:
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+            logger.debug(f"Webhook to {url} failed (attempt {attempt + 1}): {error}")
+
+        self.metrics.failures += 1
+        raise RuntimeError(f"Webhook to {url} failed: {error}")
@@ -0,0 +1,102 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+import asyncio
+
+import pytest
+from pipecat.services.openai import OpenAILLMService
+
+from pipecat_flows import FlowManager
+
+
+class NullTask:
+    """Discards the frames a FlowManager queues."""
+
+    async def queue_frames(self, frames):
+        pass
+
+    async def queue_frame(self, frame):
+        pass
+
+
+def flow_config(action):
+    return {
+        "initial_node": "start",
+        "nodes": {
+            "start": {
+                "messages": [{"role": "system", "content": "Greet the user."}],
+                "functions": [
+                    {
+                        "type": "function",
+                        "function": {
+                            "name": "next",
+                            "description": "Move on",
+                            "parameters": {"type": "object", "properties": {}},
+                        },
+                    }
+                ],
+            },
+            "next": {
+                "messages": [{"role": "system", "content": "Carry on."}],
+                "functions": [],
+                "pre_actions": [action],
+            },
+        },
+    }
+
+
+async def transition(action, delay=0.0, fails=False):
+    """Transition to a node running the action, and return the handlers' calls."""
+    calls = []
+
+    async def notify(action):
+        await asyncio.sleep(delay)
+        if fails:
+            raise RuntimeError("notify failed")
+        calls.append("notify")
+
+    async def apologize(action):
+        calls.append("apologize")
+
+    llm = OpenAILLMService(api_key="test", model="gpt-4o")
+    flow_manager = FlowManager(flow_config(action), NullTask(), llm)
+    flow_manager.register_action("notify", notify)
+    flow_manager.register_action("apologize", apologize)
+    await flow_manager.initialize([])
+    await flow_manager.handle_transition("next")
+    # Let an action left running in the background complete
+    await asyncio.sleep(delay + 0.05)
+    return calls
+
+
+@pytest.mark.parametrize(
+    "on_timeout, expected",
+    [("cancel", ["apologize"]), ("background", ["notify"])],
+)
+def test_fallback_runs_only_if_the_action_is_cancelled(on_timeout, expected):
+    action = {
+        "type": "notify",
+        "timeout": 0.01,
+        "on_timeout": on_timeout,
+        "fallback": {"type": "apologize"},
+    }
+
+    calls = asyncio.run(transition(action, delay=0.05))
+
+    assert calls == expected
+
+
+def test_fallback_runs_when_a_background_action_fails():
+    action = {
+        "type": "notify",
+        "timeout": 1.0,
+        "on_timeout": "background",
+        "fallback": {"type": "apologize"},
+    }
+
+    calls = asyncio.run(transition(action, fails=True))
+
+    assert calls == ["apologize"]
@@ -0,0 +1,74 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+import asyncio
+
+from pipecat_flows import BackgroundActionPool, OverflowPolicy
+
+
+def job(log, name, delay=0.001):
+    async def run():
+        log.append(name)
+        await asyncio.sleep(delay)
+
+    return run
+
+
+def test_spill_runs_every_job_in_order():
+    async def run():
+        pool = BackgroundActionPool(workers=1, max_queue=1, policy=OverflowPolicy.SPILL)
+        log = []
+        for i in range(6):
+            assert await pool.submit(job(log, i))
+            if i == 0:
+                # Let the worker take the first job
+                await asyncio.sleep(0)
+        await asyncio.wait_for(pool.join(), 2)
+        return pool, log
+
+    pool, log = asyncio.run(run())
+
+    assert log == list(range(6))
+    assert pool.pending == 0
+    assert pool.metrics.completed == 6
+    assert pool.metrics.spilled == 4
+
+
+def test_spill_keeps_order_while_the_buffer_drains():
+    async def run():
+        pool = BackgroundActionPool(workers=2, max_queue=1, policy=OverflowPolicy.SPILL)
+        log = []
+        for i in range(4):
+            await pool.submit(job(log, i, delay=0.01))
+        # Slots free up as jobs finish, but new jobs still wait behind spilled ones
+        await asyncio.sleep(0.015)
+        for i in range(4, 8):
+            await pool.submit(job(log, i, delay=0.01))
+        await asyncio.wait_for(pool.join(), 2)
+        return pool, log
+
+    pool, log = asyncio.run(run())
+
+    assert log == list(range(8))
+    assert pool.metrics.completed == 8
+    assert pool.metrics.failed == 0
+
+
+def test_drop_discards_jobs_when_full():
+    async def run():
+        pool = BackgroundActionPool(workers=1, max_queue=1, policy=OverflowPolicy.DROP)
+        log = []
+        results = [await pool.submit(job(log, 0))]
+        await asyncio.sleep(0)
+        results += [await pool.submit(job(log, i)) for i in (1, 2)]
+        await asyncio.wait_for(pool.join(), 2)
+        return pool, log, results
+
+    pool, log, results = asyncio.run(run())
+
+    assert results == [True, True, False]
+    assert log == [0, 1]
+    assert pool.metrics.dropped == 1
@@ -0,0 +1,40 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+import json
+
+from pipecat_flows.cli import main
+
+FLOW_CONFIG = {
+    "initial_node": "start",
+    "nodes": {
+        "start": {
+            "messages": [{"role": "system", "content": "Say goodbye."}],
+            "functions": [],
+            "post_actions": [{"type": "end_conversation"}],
+        }
+    },
+}
+
+
+def write_flow(tmp_path):
+    path = tmp_path / "flow.json"
+    path.write_text(json.dumps(FLOW_CONFIG))
+    return str(path)
+
+
+def test_compile_writes_the_artifact(tmp_path):
+    output = tmp_path / "flow.pcflow"
+
+    assert main(["compile", write_flow(tmp_path), "-p", "openai", "-o", str(output)]) == 0
+    assert output.exists()
+
+
+def test_compile_reports_write_errors(tmp_path, capsys):
+    output = tmp_path / "missing" / "flow.pcflow"
+
+    assert main(["compile", write_flow(tmp_path), "-p", "openai", "-o", str(output)]) == 1
+    assert capsys.readouterr().err.startswith("error: ")
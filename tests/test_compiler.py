@@ -0,0 +1,69 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+import copy
+
+from pipecat_flows import CompiledFlow, LLMProvider
+
+
+def function(name):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": name,
+            "parameters": {"type": "object", "properties": {}},
+        },
+    }
+
+
+def flow_config():
+    return {
+        "initial_node": "start",
+        "nodes": {
+            "start": {
+                "messages": [{"role": "system", "content": "Greet the user."}],
+                "functions": [function("end")],
+            },
+            "end": {
+                "messages": [{"role": "system", "content": "Say goodbye."}],
+                "functions": [],
+                "post_actions": [{"type": "end_conversation"}],
+            },
+        },
+    }
+
+
+def test_from_config_reuses_the_flow_of_a_config():
+    config = flow_config()
+
+    flow = CompiledFlow.from_config(config, LLMProvider.OPENAI)
+
+    assert CompiledFlow.from_config(config, LLMProvider.OPENAI) is flow
+    assert CompiledFlow.from_config(copy.deepcopy(config), LLMProvider.OPENAI) is flow
+
+
+def test_from_config_compiles_changed_configs():
+    config = flow_config()
+    flow = CompiledFlow.from_config(config, LLMProvider.OPENAI)
+
+    changed = copy.deepcopy(config)
+    changed["nodes"]["start"]["messages"][0]["content"] = "Welcome the user."
+    other = CompiledFlow.from_config(changed, LLMProvider.OPENAI)
+
+    assert other is not flow
+    assert other.nodes["start"].messages[0]["content"] == "Welcome the user."
+
+
+def test_from_config_converts_a_cached_flow_for_another_provider():
+    config = flow_config()
+    flow = CompiledFlow.from_config(config, LLMProvider.OPENAI)
+
+    anthropic = CompiledFlow.from_config(config, LLMProvider.ANTHROPIC)
+
+    assert anthropic.provider == LLMProvider.ANTHROPIC
+    assert anthropic.nodes is not flow.nodes
+    assert anthropic.successors is flow.successors
@@ -0,0 +1,187 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+import asyncio
+
+import pytest
+from pipecat.frames.frames import LLMMessagesAppendFrame, LLMMessagesUpdateFrame, LLMSetToolsFrame
+from pipecat.processors.aggregators.openai_llm_context import OpenAILLMContext
+from pipecat.services.openai import OpenAILLMService
+
+from pipecat_flows import FlowManager
+
+
+def function(name):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": name,
+            "parameters": {"type": "object", "properties": {}},
+        },
+    }
+
+
+def node(name, functions):
+    return {
+        "messages": [{"role": "system", "content": f"Node {name}"}],
+        "functions": [function(f) for f in functions],
+        "pre_actions": [{"type": "tts_say", "text": f"Entering {name}"}],
+    }
+
+
+FLOW_CONFIG = {
+    "initial_node": "start",
+    "nodes": {
+        "start": node("start", ["a", "b", "lookup"]),
+        "a": node("a", ["b", "end"]),
+        "b": node("b", ["a", "end"]),
+        "end": node("end", []),
+    },
+}
+
+
+class StubTask:
+    """Applies the context frames to the context, like the context aggregator."""
+
+    def __init__(self, context):
+        self.context = context
+
+    async def queue_frames(self, frames):
+        for frame in frames:
+            await self.queue_frame(frame)
+
+    async def queue_frame(self, frame):
+        await asyncio.sleep(0)
+        if isinstance(frame, LLMMessagesAppendFrame):
+            self.context.add_messages(frame.messages)
+        elif isinstance(frame, LLMMessagesUpdateFrame):
+            self.context.set_messages(frame.messages)
+        elif isinstance(frame, LLMSetToolsFrame):
+            self.context.set_tools(frame.tools)
+
+
+class StubTTS:
+    async def say(self, text):
+        await asyncio.sleep(0.01)
+
+
+class StubLLM(OpenAILLMService):
+    """Runs the tool calls of one LLM turn the way OpenAILLMService does.
+
+    Every call is announced to its start callback while the response streams,
+    then the calls run one after another. With concurrent=True they run in
+    parallel instead, as services running tool calls concurrently would.
+    """
+
+    async def run_turn(self, context, names, concurrent=False):
+        results = [None] * len(names)
+        for name in names:
+            await self.call_start_function(context, name)
+
+        async def call(index, name):
+            async def result_callback(result):
+                results[index] = result
+
+            handler = self._callbacks.get(name, self._callbacks.get(None))
+            await handler(name, f"call_{index}", {}, self, context, result_callback)
+
+        if concurrent:
+            await asyncio.gather(*(call(i, name) for i, name in enumerate(names)))
+        else:
+            for index, name in enumerate(names):
+                await call(index, name)
+        return results
+
+
+async def run_turn(names, concurrent=False):
+    llm = StubLLM(api_key="test", model="gpt-4o")
+
+    async def lookup(function_name, tool_call_id, args, llm, context, result_callback):
+        await asyncio.sleep(0.005)
+        await result_callback({"found": True})
+
+    llm.register_function("lookup", lookup)
+    context = OpenAILLMContext()
+    flow_manager = FlowManager(FLOW_CONFIG, StubTask(context), llm, StubTTS())
+    await flow_manager.initialize([])
+    results = await llm.run_turn(context, names, concurrent)
+    return flow_manager, context, results
+
+
+def assert_consistent(flow_manager, context):
+    current = flow_manager.flow.current_node
+    tools = [tool["function"]["name"] for tool in context.tools]
+    expected = [f["function"]["name"] for f in FLOW_CONFIG["nodes"][current]["functions"]]
+    assert tools == expected
+    assert context.messages[-1]["content"] == f"Node {current}"
+
+
+def not_transitioned(node):
+    return {
+        "status": "not_transitioned",
+        "message": f"Not transitioned, the flow is at node '{node}'",
+    }
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_duplicate_edge_calls_transition_once(concurrent):
+    flow_manager, context, results = asyncio.run(run_turn(["a", "a"], concurrent))
+
+    assert flow_manager.flow.current_node == "a"
+    assert flow_manager.metrics.transitions == 1
+    assert flow_manager.metrics.transitions_dropped == 1
+    assert results == ["Acknowledged", not_transitioned("a")]
+    assert_consistent(flow_manager, context)
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_competing_edge_calls_keep_the_first(concurrent):
+    # Node a offers b, so only the turn tells that b was chosen from start
+    flow_manager, context, results = asyncio.run(run_turn(["a", "b"], concurrent))
+
+    assert flow_manager.flow.current_node == "a"
+    assert flow_manager.metrics.transitions == 1
+    assert flow_manager.metrics.transitions_dropped == 1
+    assert results == ["Acknowledged", not_transitioned("a")]
+    assert_consistent(flow_manager, context)
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_node_functions_run_alongside_edge_calls(concurrent):
+    flow_manager, context, results = asyncio.run(
+        run_turn(["lookup", "b", "lookup", "a"], concurrent)
+    )
+
+    assert flow_manager.flow.current_node == "b"
+    assert flow_manager.metrics.transitions == 1
+    assert flow_manager.metrics.transitions_dropped == 1
+    assert results == [{"found": True}, "Acknowledged", {"found": True}, not_transitioned("b")]
+    assert_consistent(flow_manager, context)
+
+
+def test_edge_calls_of_successive_turns_all_transition():
+    async def run():
+        flow_manager, context, _ = await run_turn([])
+        llm = flow_manager.llm
+        results = [await llm.run_turn(context, [name]) for name in ("a", "b", "a")]
+        return flow_manager, context, results
+
+    flow_manager, context, results = asyncio.run(run())
+
+    assert flow_manager.flow.current_node == "a"
+    assert flow_manager.metrics.transitions == 3
+    assert flow_manager.metrics.transitions_dropped == 0
+    assert results == [["Acknowledged"]] * 3
+    assert_consistent(flow_manager, context)
+
+
+def test_edge_call_the_node_does_not_offer():
+    flow_manager, context, results = asyncio.run(run_turn(["end"]))
+
+    assert flow_manager.flow.current_node == "start"
+    assert flow_manager.metrics.transitions == 0
+    assert results == [not_transitioned("start")]
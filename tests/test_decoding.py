@@ -0,0 +1,73 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+import json
+import re
+
+import pytest
+
+from pipecat_flows import CompiledFlow, LLMProvider, decode_flow_config, decoding
+
+FLOW_CONFIG = {
+    "initial_node": "start",
+    "editor": {"layout": "horizontal"},
+    "nodes": {
+        "start": {
+            "messages": [{"role": "system", "content": "Greet the user."}],
+            "functions": [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": "end",
+                        "description": "End the conversation",
+                        "parameters": {"type": "object", "properties": {}},
+                    },
+                }
+            ],
+        },
+        "end": {
+            "messages": [{"role": "system", "content": "Say goodbye."}],
+            "functions": [],
+            "post_actions": [{"type": "end_conversation"}],
+        },
+    },
+}
+
+
+@pytest.fixture(params=["msgspec", "json"])
+def backend(request, monkeypatch):
+    if request.param == "msgspec":
+        pytest.importorskip("msgspec")
+    else:
+        monkeypatch.setattr(decoding, "msgspec", None)
+    return request.param
+
+
+def test_decodes_the_config_as_written(backend):
+    # Keys the runtime doesn't read are kept, and optional fields aren't added
+    assert decode_flow_config(json.dumps(FLOW_CONFIG)) == FLOW_CONFIG
+
+
+@pytest.mark.parametrize(
+    "function, path",
+    [
+        ({"type": "function", "function": {"description": "End"}}, "functions[0].function"),
+        (
+            {"function_declarations": [{"description": "End"}]},
+            "functions[0].function_declarations[0]",
+        ),
+        ({"description": "End", "input_schema": {}}, "functions[0]"),
+    ],
+)
+def test_function_without_name_is_rejected(backend, function, path):
+    config = json.loads(json.dumps(FLOW_CONFIG))
+    config["nodes"]["start"]["functions"] = [function]
+
+    message = f"missing required field `name` - at `$.nodes.start.{path}`"
+    with pytest.raises(ValueError, match=re.escape(message)):
+        decode_flow_config(json.dumps(config))
+    with pytest.raises(ValueError, match="missing required field `name`"):
+        CompiledFlow(config, LLMProvider.OPENAI)
@@ -0,0 +1,117 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+import asyncio
+import json
+
+import pytest
+from pipecat.frames.frames import EndFrame
+from pipecat.pipeline.pipeline import Pipeline
+from pipecat.pipeline.runner import PipelineRunner
+from pipecat.pipeline.task import PipelineParams, PipelineTask
+from pipecat.processors.aggregators.openai_llm_context import (
+    OpenAILLMContext,
+    OpenAILLMContextFrame,
+)
+from pipecat.services.openai import OpenAILLMService
+
+from pipecat_flows import FlowManager
+
+TRANSITIONS = 5
+
+
+def chain_flow(length):
+    """Build a chain n0 -> n1 -> ... where each node's only function leads to the next."""
+    nodes = {}
+    for i in range(length + 1):
+        functions = []
+        if i < length:
+            functions.append(
+                {
+                    "type": "function",
+                    "function": {
+                        "name": f"n{i + 1}",
+                        "description": "Move on",
+                        "parameters": {"type": "object", "properties": {}},
+                    },
+                }
+            )
+        nodes[f"n{i}"] = {
+            "messages": [{"role": "system", "content": f"Instructions for n{i}"}],
+            "functions": functions,
+        }
+    return {"initial_node": "n0", "nodes": nodes}
+
+
+class CountingLLM(OpenAILLMService):
+    """Records each inference and answers it by calling the current node's function."""
+
+    def __init__(self):
+        super().__init__(api_key="test", model="gpt-4o")
+        self.flow_manager = None
+        self.inferences = []
+        self.done = asyncio.Event()
+
+    async def process_frame(self, frame, direction):
+        if not isinstance(frame, OpenAILLMContextFrame):
+            await super().process_frame(frame, direction)
+            return
+
+        context = frame.context
+        node = self.flow_manager.flow.current_node
+        tools = [tool["function"]["name"] for tool in context.tools or []]
+        self.inferences.append(
+            (node, f"Instructions for {node}" in json.dumps(context.messages), tools)
+        )
+        step = int(node[1:])
+        if step < TRANSITIONS:
+            await self.call_function(
+                context=context,
+                tool_call_id=f"call_{step}",
+                function_name=f"n{step + 1}",
+                arguments="{}",
+            )
+        else:
+            self.done.set()
+
+
+async def run_chain(**flow_manager_options):
+    """Run the chain through a pipeline and return the inferences the LLM saw."""
+    llm = CountingLLM()
+    context = OpenAILLMContext()
+    aggregators = llm.create_context_aggregator(context)
+    task = PipelineTask(
+        Pipeline([aggregators.user(), llm, aggregators.assistant()]), PipelineParams()
+    )
+    runner = asyncio.create_task(PipelineRunner(handle_sigint=False).run(task))
+    await asyncio.sleep(0.05)
+
+    flow_manager = FlowManager(chain_flow(TRANSITIONS), task, llm, **flow_manager_options)
+    llm.flow_manager = flow_manager
+    await flow_manager.initialize([])
+    await task.queue_frames([aggregators.user().get_context_frame()])
+    try:
+        await asyncio.wait_for(llm.done.wait(), 5)
+    finally:
+        await task.queue_frame(EndFrame())
+        await runner
+    return llm.inferences
+
+
+@pytest.mark.parametrize("fold_into_result", [False, True])
+def test_one_inference_per_transition(fold_into_result):
+    inferences = asyncio.run(run_chain(fold_into_result=fold_into_result))
+
+    # One inference for the initial node, then one per transition
+    assert [node for node, _, _ in inferences] == [f"n{i}" for i in range(TRANSITIONS + 1)]
+
+
+def test_folded_transitions_run_on_the_new_node():
+    inferences = asyncio.run(run_chain(fold_into_result=True))
+
+    for i, (node, has_instructions, tools) in enumerate(inferences):
+        assert has_instructions, node
+        assert tools == ([f"n{i + 1}"] if i < TRANSITIONS else [])
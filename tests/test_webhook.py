@@ -0,0 +1,144 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from pipecat_flows import WebhookClient
+
+
+class StubEndpoint:
+    """Local stand-in for a webhook endpoint, answering with the given statuses."""
+
+    def __init__(self, statuses=(200,), delay=0.0):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.bodies = []
+
+    async def handle(self, request):
+        self.bodies.append(await request.json())
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return web.Response(status=status)
+
+
+async def send_all(endpoint, actions, **client_options):
+    """Send webhook actions concurrently to a local server running the endpoint."""
+    app = web.Application()
+    app.router.add_post("/events", endpoint.handle)
+    server = TestServer(app)
+    await server.start_server()
+    client = WebhookClient(backoff=0.0, **client_options)
+    try:
+        url = str(server.make_url("/events"))
+        results = await asyncio.gather(
+            *(client.send({"type": "webhook", "url": url, **action}) for action in actions),
+            return_exceptions=True,
+        )
+    finally:
+        await client.close()
+        await server.close()
+    return client, results
+
+
+def test_sends_the_payload():
+    endpoint = StubEndpoint()
+
+    client, results = asyncio.run(send_all(endpoint, [{"payload": {"event": "confirmed"}}]))
+
+    assert results == [None]
+    assert endpoint.bodies == [{"event": "confirmed"}]
+    assert client.metrics.requests == 1
+    assert client.metrics.failures == 0
+
+
+def test_retries_server_errors():
+    endpoint = StubEndpoint(statuses=[503, 500, 200])
+
+    client, results = asyncio.run(send_all(endpoint, [{"payload": {"n": 1}, "retries": 2}]))
+
+    assert results == [None]
+    assert len(endpoint.bodies) == 3
+    assert client.metrics.retries == 2
+    assert client.metrics.failures == 0
+
+
+def test_fails_once_retries_are_exhausted():
+    endpoint = StubEndpoint(statuses=[503])
+
+    client, results = asyncio.run(send_all(endpoint, [{"payload": {"n": 1}, "retries": 1}]))
+
+    assert isinstance(results[0], RuntimeError)
+    assert "HTTP 503" in str(results[0])
+    assert len(endpoint.bodies) == 2
+    assert client.metrics.failures == 1
+
+
+@pytest.mark.parametrize("status", [400, 404])
+def test_client_errors_are_not_retried(status):
+    endpoint = StubEndpoint(statuses=[status])
+
+    client, results = asyncio.run(send_all(endpoint, [{"payload": {"n": 1}, "retries": 3}]))
+
+    assert isinstance(results[0], RuntimeError)
+    assert len(endpoint.bodies) == 1
+    assert client.metrics.retries == 0
+
+
+def test_request_timeout_applies_to_each_attempt():
+    endpoint = StubEndpoint(delay=1.0)
+
+    start = time.perf_counter()
+    client, results = asyncio.run(
+        send_all(endpoint, [{"payload": {"n": 1}, "retries": 1, "request_timeout": 0.05}])
+    )
+
+    assert isinstance(results[0], RuntimeError)
+    assert client.metrics.requests == 2
+    assert time.perf_counter() - start < 1.0
+
+
+def test_batches_payloads_to_the_same_endpoint():
+    endpoint = StubEndpoint()
+    batch = {"max_size": 3, "max_delay": 10}
+
+    client, results = asyncio.run(
+        send_all(endpoint, [{"payload": {"n": n}, "batch": batch} for n in range(6)])
+    )
+
+    assert results == [None] * 6
+    assert endpoint.bodies == [[{"n": 0}, {"n": 1}, {"n": 2}], [{"n": 3}, {"n": 4}, {"n": 5}]]
+    assert client.metrics.batches == 2
+    assert client.metrics.events == 6
+
+
+def test_batch_is_sent_after_its_delay():
+    endpoint = StubEndpoint()
+    batch = {"max_size": 10, "max_delay": 0.01}
+
+    client, results = asyncio.run(
+        send_all(endpoint, [{"payload": {"n": n}, "batch": batch} for n in range(2)])
+    )
+
+    assert results == [None, None]
+    assert endpoint.bodies == [[{"n": 0}, {"n": 1}]]
+
+
+def test_failed_batch_fails_every_action():
+    endpoint = StubEndpoint(statuses=[400])
+    batch = {"max_size": 2, "max_delay": 10}
+
+    client, results = asyncio.run(
+        send_all(endpoint, [{"payload": {"n": n}, "batch": batch} for n in range(2)])
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert client.metrics.requests == 1